@@ -1,35 +1,54 @@
+import threading
+from collections import defaultdict
+
 # Prefect
 from prefect import task
-from prefect.variables import Variable
+from prefect.runtime import flow_run
 from prefect.artifacts import create_table_artifact
 
+# Entries of the data artifact, by flow run id
+_artifact_entries = defaultdict(list)
+_artifact_lock = threading.Lock()
+
+
+def add_artifact_entry(run_id, entry):
+    """
+    Add an entry to the data artifact of a flow run
+
+    Args:
+        run_id: id of the flow run
+        entry: row of the artifact
+    """
+    with _artifact_lock:
+        _artifact_entries[run_id].append(entry)
+
+
+def pop_artifact_entries(run_id):
+    """
+    Remove and return the entries of the data artifact of a flow run
+
+    Args:
+        run_id: id of the flow run
+
+    Returns:
+        list: rows of the artifact
+    """
+    with _artifact_lock:
+        return _artifact_entries.pop(run_id, [])
+
 
-@task(
-    name="update_data_artifact",
-    description="Update data artifact",
-    task_run_name="update-data-artifact",
-)
 def upd_data_artifact(info, data):
     """
     Update Artifact
 
-    - Retrieve the artifact from the Prefect Variable
-    - Add data to the artifact
-        - Save the artifact back to the Prefect Variable
+    - Add data to the entries of the current flow run (in memory)
+    - The entries are published once, by `save_artifact` at the end of the flow
 
     Args:
         info: information
         data: data to add
     """
-
-    # get varoaible
-    data_artifact = Variable.get("data_artifact", default=[])
-
-    # add data
-    data_artifact.append({"info": info, "data": data})
-
-    # save variable
-    Variable.set("data_artifact", data_artifact, overwrite=True)
+    add_artifact_entry(flow_run.id, {"info": info, "data": data})
 
 
 @task(
@@ -41,22 +60,22 @@ def save_artifact(key_name: str):
     """
     Save artifact in Prefect for the Flow
 
-    - Retrieve the artifact from the Prefect Variable
-    - save the artifact with the data
-    - Reset the Prefect Variable for the next run
+    - Retrieve the entries of the current flow run
+    - save the artifact with the data (a single table artifact)
+    - Drop the entries of the run
 
     Args:
         key: key of artifact (name of the artifact)
     """
 
     # get data
-    data_artifact = Variable.get("data_artifact", default=[])
+    data_artifact = pop_artifact_entries(flow_run.id)
+
+    if not data_artifact:
+        return
 
     # create data
     create_table_artifact(
         key=key_name,
         table=data_artifact,
     )
-
-    # reset variable
-    Variable.set("data_artifact", [], overwrite=True)
@@ -28,14 +28,15 @@ def my_test_flow():
     logger.info("FLOW TEST START")
     logger.info("-" * 50)
 
-    # Run the ingestion flow
-    task_ingestion()
-
-    # Run the transformation flow
-    task_transform()
-
-    # Save the artifact
-    save_artifact(key_name="my-test-flow")
+    try:
+        # Run the ingestion flow
+        task_ingestion()
+
+        # Run the transformation flow
+        task_transform()
+    finally:
+        # Save the artifact (also the entries of a failed run)
+        save_artifact(key_name="my-test-flow")
 
     logger.info("-" * 50)
     logger.info("FLOW TEST END")
@@ -0,0 +1,77 @@
+"""
+Benchmark of the conversion of a large CSV file to Parquet
+
+Compare the whole file loaded in memory (`load_data` + `save_data` of a
+table) with the streaming mode (batches scanned by blocks of
+`CSV_BLOCK_SIZE` and written one by one). Each mode runs in its own
+process, so the peak memory (max RSS) of each one is measured separately.
+
+The files are written in a temporary directory.
+
+Usage:
+    python -m benchmarks.bench_csv_stream [nb_rows]
+"""
+
+import os
+import sys
+import time
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+
+import pyarrow.parquet as pq
+from prefect.logging import disable_run_logger
+
+from core.libs.utils import load_data, save_data
+from benchmarks.bench_load_data import make_launch_table
+
+
+def run(mode, csv_path, parquet_path):
+    """
+    Convert the CSV file with one mode and print its time and peak memory
+    """
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    with disable_run_logger():
+        if mode == "stream":
+            save_data.fn(load_data.fn(csv_path, stream=True), parquet_path)
+        else:
+            save_data.fn(load_data.fn(csv_path), parquet_path)
+    duration = time.perf_counter() - start
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{duration} {(rss_after - rss_before) / 1024}")
+
+
+if __name__ == "__main__":
+
+    if sys.argv[1:2] == ["--mode"]:
+        run(sys.argv[2], sys.argv[3], sys.argv[4])
+        sys.exit()
+
+    nb_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+
+    with tempfile.TemporaryDirectory() as tmp_dir, disable_run_logger():
+        csv_path = str(Path(tmp_dir) / "launches.csv")
+        save_data.fn(make_launch_table(nb_rows), csv_path)
+
+        print(f"{nb_rows} rows, CSV of {os.path.getsize(csv_path) / 1024**2:,.0f} MiB")
+
+        for mode in ["table", "stream"]:
+            parquet_path = str(Path(tmp_dir) / f"launches_{mode}.parquet")
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_csv_stream", "--mode"]
+                + [mode, csv_path, parquet_path],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+
+            duration, memory = float(output[0]), float(output[1])
+            print(
+                f"{mode:<6}: {duration:.3f}s -> {nb_rows / duration:,.0f} rows/s, "
+                f"peak memory +{memory:,.0f} MiB, "
+                f"{pq.ParquetFile(parquet_path).metadata.num_rows} rows written"
+            )
@@ -0,0 +1,132 @@
+"""
+Benchmark of the column extraction of `filter_columns`
+
+Compare the per-row `get_nested_value` extraction with the compiled
+columnar extractor and the Arrow engine (struct field access) on
+synthetic launch records.
+
+Usage:
+    python -m benchmarks.bench_extractor [nb_records]
+"""
+
+import sys
+import json
+import time
+import tempfile
+from pathlib import Path
+
+import yaml
+import pyarrow as pa
+import pyarrow.json as paj
+
+from core.config.path import PATH_CONFIG_SCHEMA
+from core.libs.schema_registry import get_column_paths
+from core.processing.ingestion import (
+    get_nested_value,
+    extract_columns,
+    records_to_table,
+    project_columns,
+)
+from benchmarks.synthetic import make_launch_records
+
+
+def filter_columns_per_row(json_data, data_schema):
+    """
+    Previous implementation of `filter_columns`: one dict per row
+    """
+    corresp_dict = {
+        col["name"]: col["link"] for col in data_schema["columns"] if "link" in col
+    }
+
+    data = []
+    for item in json_data:
+        filtered_item = {}
+        for new_name, old_name in corresp_dict.items():
+            filtered_item[new_name] = get_nested_value(item, old_name)
+        data.append(filtered_item)
+
+    return pa.Table.from_pylist(data)
+
+
+def filter_columns_compiled(json_data, data_schema):
+    """
+    Current implementation of `filter_columns`: one list per column
+    """
+    column_paths = get_column_paths(data_schema)
+    return pa.Table.from_pydict(extract_columns(json_data, column_paths))
+
+
+def project_columns_arrow(json_data, data_schema):
+    """
+    Arrow engine: records -> struct columns -> struct field access
+    """
+    return project_columns.fn(records_to_table(json_data), data_schema)
+
+
+def load_json_compiled(file_path, data_schema):
+    """
+    JSON dump: json.load of the array + compiled extractor
+    """
+    with open(file_path, "r") as f:
+        json_data = json.load(f)
+
+    return filter_columns_compiled(json_data, data_schema)
+
+
+def load_jsonl_arrow(file_path, data_schema):
+    """
+    JSON Lines dump: PyArrow JSON reader + struct field access
+    """
+    return project_columns.fn(paj.read_json(file_path), data_schema)
+
+
+def bench(func, json_data, data_schema, repeat=3):
+    """
+    Best time of `repeat` runs
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        table = func(json_data, data_schema)
+        best = min(best, time.perf_counter() - start)
+
+    return best, table
+
+
+if __name__ == "__main__":
+
+    nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with open(PATH_CONFIG_SCHEMA, "r") as file:
+        data_schema = yaml.safe_load(file)["datamodel"]["tables"][0]
+
+    json_data = make_launch_records(nb_records)
+
+    time_row, table_row = bench(filter_columns_per_row, json_data, data_schema)
+    time_col, table_col = bench(filter_columns_compiled, json_data, data_schema)
+    time_arrow, table_arrow = bench(project_columns_arrow, json_data, data_schema)
+
+    assert table_row.equals(table_col), "Both implementations must give the same table"
+    assert table_row.equals(table_arrow), "Both engines must give the same table"
+
+    print(f"{nb_records} records, {len(data_schema['columns'])} columns")
+    print(f"per row  : {time_row:.3f}s -> {nb_records / time_row:,.0f} rows/s")
+    print(f"compiled : {time_col:.3f}s -> {nb_records / time_col:,.0f} rows/s")
+    print(f"arrow    : {time_arrow:.3f}s -> {nb_records / time_arrow:,.0f} rows/s")
+    print(
+        f"speedup  : x{time_row / time_col:.1f} compiled, x{time_row / time_arrow:.1f} arrow"
+    )
+
+    # From JSON dumps on disk
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_path = Path(tmp_dir) / "launches.json"
+        jsonl_path = Path(tmp_dir) / "launches.jsonl"
+
+        json_path.write_text(json.dumps(json_data))
+        jsonl_path.write_text("\n".join(json.dumps(item) for item in json_data))
+
+        time_json, _ = bench(load_json_compiled, json_path, data_schema)
+        time_jsonl, _ = bench(load_jsonl_arrow, jsonl_path, data_schema)
+
+    print(f"file .json  + compiled : {nb_records / time_json:,.0f} rows/s")
+    print(f"file .jsonl + arrow    : {nb_records / time_jsonl:,.0f} rows/s")
@@ -0,0 +1,159 @@
+"""
+Benchmark of the end-to-end latency of the flow
+
+Compare the previous orchestration (tasks called one after another) with
+the tasks submitted to the task runner of the flow (thread pool, process
+pool), on a local stub of the launches API with a fixed delay per request.
+
+The flows run in a temporary directory (the data of the project is not
+touched) and need a Prefect API (`prefect server start`).
+
+Usage:
+    python -m benchmarks.bench_flow_latency [nb_records] [nb_runs] [delay_ms]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+
+from prefect import flow
+
+from core.config.path import PATH_DATA_STATE
+from core.libs.utils import save_artifact
+from core.processing.ingestion import task_ingestion
+from core.processing.transform import task_transform
+from core.processing.orchestration import get_task_runner
+from benchmarks.synthetic import make_launch_records
+
+
+def start_stub_api(records, delay):
+    """
+    Start a local stub of the launches API (limit/offset pages)
+
+    Args:
+        records: launch records served by the API
+        delay: delay of each response, in seconds
+
+    Returns:
+        ThreadingHTTPServer: running server
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            query = dict(parse_qsl(urlsplit(self.path).query))
+            limit = int(query.get("limit", 100))
+            offset = int(query.get("offset", 0))
+
+            body = json.dumps(
+                {
+                    "count": len(records),
+                    "next": None,
+                    "results": records[offset : offset + limit],
+                }
+            ).encode()
+
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def reset_ingestion_state():
+    """
+    Forget the fingerprints and watermarks of the sources, so that each run
+    ingests the whole window of the API (no skipped or incremental ingestion)
+    """
+    for pattern in ["fingerprint_*.json", "watermark_*.json"]:
+        for path in Path(PATH_DATA_STATE).glob(pattern):
+            path.unlink()
+
+
+@flow(name="bench_flow_sequential")
+def flow_sequential(url: str, max_records: int):
+    """
+    Previous orchestration: the tasks are called one after another
+    """
+    try:
+        task_ingestion(url=url, max_records=max_records)
+        task_transform(incremental=True)
+    finally:
+        save_artifact(key_name="bench-flow-latency")
+
+
+@flow(name="bench_flow_submit")
+def flow_submit(url: str, max_records: int):
+    """
+    Current orchestration: the tasks are submitted to the task runner
+    """
+    try:
+        ingestion = task_ingestion.submit(url=url, max_records=max_records)
+        transform = task_transform.submit(incremental=True, wait_for=[ingestion])
+
+        for future in [ingestion, transform]:
+            future.result()
+    finally:
+        save_artifact(key_name="bench-flow-latency")
+
+
+if __name__ == "__main__":
+
+    nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    nb_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    delay = (int(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    server = start_stub_api(make_launch_records(nb_records), delay)
+    url = (
+        f"http://127.0.0.1:{server.server_port}/launches/"
+        "?limit=100&offset=0&ordering=-last_updated&mode=list"
+    )
+
+    flows = {
+        "sequential": flow_sequential,
+        "thread": flow_submit.with_options(task_runner=get_task_runner("thread")),
+        "process": flow_submit.with_options(task_runner=get_task_runner("process")),
+    }
+
+    print(f"{nb_records} records, {nb_runs} runs, {delay * 1000:.0f} ms per request")
+
+    # Run in a temporary directory, with the config of the project
+    project_dir = Path.cwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.symlink(project_dir / "core", Path(tmp_dir) / "core")
+        os.chdir(tmp_dir)
+
+        for name, bench_flow in flows.items():
+            # First run: warm up (imports, worker processes, first dataset files)
+            reset_ingestion_state()
+            bench_flow(url=url, max_records=nb_records)
+
+            durations = []
+            for _ in range(nb_runs):
+                reset_ingestion_state()
+                start = time.perf_counter()
+                bench_flow(url=url, max_records=nb_records)
+                durations.append(time.perf_counter() - start)
+
+            durations.sort()
+            print(
+                f"{name:<10}: median {durations[len(durations) // 2]:.3f}s, "
+                f"min {durations[0]:.3f}s, max {durations[-1]:.3f}s"
+            )
+
+        os.chdir(project_dir)
+
+    server.shutdown()
@@ -0,0 +1,96 @@
+"""
+Benchmark of `nb_launches_by_country`
+
+Compare the previous implementation (one filter of the whole table per
+country) with the single pass hash group-by, for growing numbers of rows.
+
+Usage:
+    python -m benchmarks.bench_group_by [nb_countries] [max_rows]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from core.processing.transform import nb_launches_by_country
+from benchmarks.synthetic import STATUSES
+
+# Above this number of rows the previous implementation is not run (too slow)
+MAX_ROWS_PER_COUNTRY_LOOP = 1_000_000
+
+
+def nb_launches_by_country_loop(table):
+    """
+    Previous implementation of `nb_launches_by_country`: one filter per country
+    """
+    results = []
+    for country in pc.unique(table["country"]):
+        country_data = table.filter(pc.equal(table["country"], country))
+        status_lower = pc.utf8_lower(country_data["status"])
+        success_data = country_data.filter(pc.equal(status_lower, "success"))
+
+        results.append(
+            {
+                "country": country.as_py(),
+                "nb_launch": country_data.num_rows,
+                "nb_success": success_data.num_rows,
+            }
+        )
+
+    return pa.Table.from_pylist(results)
+
+
+def make_launches(nb_rows, nb_countries):
+    """
+    Make a table of launches (country, status)
+    """
+    rng = np.random.default_rng(42)
+    countries = pa.array([f"Country {i}" for i in range(nb_countries)])
+    statuses = pa.array(STATUSES)
+
+    return pa.table(
+        {
+            "country": countries.take(rng.integers(0, nb_countries, nb_rows)),
+            "status": statuses.take(rng.integers(0, len(STATUSES), nb_rows)),
+        }
+    )
+
+
+def bench(func, table):
+    """
+    Time of one run
+    """
+    start = time.perf_counter()
+    result = func(table)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+
+    nb_countries = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    max_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000_000
+
+    print(f"{nb_countries} countries")
+    print(f"{'rows':>12} | {'group-by':>22} | {'loop per country':>22}")
+
+    nb_rows = max_rows // 16
+    while nb_rows <= max_rows:
+        table = make_launches(nb_rows, nb_countries)
+
+        time_group, result = bench(nb_launches_by_country.fn, table)
+        line = (
+            f"{nb_rows:>12,} | {time_group:>7.3f}s {nb_rows / time_group:>10,.0f} r/s"
+        )
+
+        if nb_rows <= MAX_ROWS_PER_COUNTRY_LOOP:
+            time_loop, expected = bench(nb_launches_by_country_loop, table)
+            line += f" | {time_loop:>7.3f}s {nb_rows / time_loop:>10,.0f} r/s"
+
+            sort_keys = [("country", "ascending")]
+            assert result.sort_by(sort_keys).equals(expected.sort_by(sort_keys))
+
+        print(line)
+        nb_rows *= 2
@@ -0,0 +1,156 @@
+"""
+Benchmark of `load_data` on a wide table of launches
+
+Compare the previous read of a Parquet file (every column, no memory map)
+with the projection of the columns of the transformation (`country`,
+`status`), the filter pushed down to the row groups, and the memory mapped
+Arrow IPC file. The memory is the Arrow memory allocated by the table
+(the memory mapped buffers are not copied, they are not allocated), each
+read runs in its own process.
+
+The files are written in a temporary directory.
+
+Usage:
+    python -m benchmarks.bench_load_data [nb_rows] [nb_runs]
+"""
+
+import sys
+import time
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from prefect.logging import disable_run_logger
+
+from core.config.settings import DATASET_MAX_ROWS_PER_GROUP
+from core.libs.utils import load_data, save_data
+from benchmarks.synthetic import STATUSES
+
+COLUMNS = ["country", "status"]
+
+
+def make_launch_table(nb_rows, seed=42):
+    """
+    Make a table with the columns of the raw dataset, sorted by launch date
+    """
+    rng = np.random.default_rng(seed)
+    start = int(datetime(1957, 10, 4, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp())
+
+    def labels(prefix, nb_values):
+        values = np.array([f"{prefix} {i}" for i in range(nb_values)])
+        return pa.array(values[rng.integers(0, nb_values, nb_rows)])
+
+    launch_date = np.sort(rng.integers(start, end, nb_rows)) * 1_000_000_000
+
+    return pa.table(
+        {
+            "id": pa.array(
+                [f"{i:08x}-0000-0000-0000-000000000000" for i in range(nb_rows)]
+            ),
+            "launch_date": pa.array(launch_date, type=pa.timestamp("ns", tz="UTC")),
+            "name": labels("Rocket | Mission", 10_000),
+            "status": pa.array(
+                np.array(STATUSES)[rng.integers(0, len(STATUSES), nb_rows)]
+            ),
+            "launch_service_provider": labels("Provider", 31),
+            "launch_site": labels("Pad", 211),
+            "country": labels("Country", 50),
+            "rocket": labels("Rocket", 97),
+            "mission": labels("Mission", 10_000),
+            "mission_type": labels("Type", 12),
+            "last_updated": pa.array(launch_date, type=pa.timestamp("ns", tz="UTC")),
+        }
+    )
+
+
+def get_reads(tmp_dir):
+    """
+    Reads of the benchmark, by name
+    """
+    parquet_path = str(Path(tmp_dir) / "launches.parquet")
+    ipc_path = str(Path(tmp_dir) / "launches.arrow")
+    recent = pc.field("launch_date") >= pa.scalar(
+        datetime(2020, 1, 1, tzinfo=timezone.utc), type=pa.timestamp("ns", tz="UTC")
+    )
+
+    return {
+        # Previous implementation: every column, no memory map
+        "parquet_all": lambda: pq.read_table(parquet_path),
+        "parquet_columns": lambda: load_data.fn(parquet_path, columns=COLUMNS),
+        "parquet_filter": lambda: load_data.fn(
+            parquet_path, columns=COLUMNS + ["launch_date"], filter=recent
+        ),
+        "ipc_columns": lambda: load_data.fn(ipc_path, columns=COLUMNS),
+        "ipc_filter": lambda: load_data.fn(
+            ipc_path, columns=COLUMNS + ["launch_date"], filter=recent
+        ),
+    }
+
+
+def run(name, tmp_dir, nb_runs):
+    """
+    Run one read and print its time and the Arrow memory of the table
+
+    The memory is measured on the first read of the process (nothing freed
+    meanwhile), the time is the median of the runs.
+    """
+    read = get_reads(tmp_dir)[name]
+
+    with disable_run_logger():
+        table = read()
+        memory = pa.total_allocated_bytes()
+        nb_rows = table.num_rows
+        del table
+
+        durations = []
+        for _ in range(nb_runs):
+            start = time.perf_counter()
+            read()
+            durations.append(time.perf_counter() - start)
+
+    durations.sort()
+    print(f"{durations[len(durations) // 2]} {memory / 1024**2} {nb_rows}")
+
+
+if __name__ == "__main__":
+
+    if sys.argv[1:2] == ["--read"]:
+        run(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        sys.exit()
+
+    nb_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    nb_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    table = make_launch_table(nb_rows)
+    print(f"{nb_rows} rows, {table.num_columns} columns, {nb_runs} runs")
+
+    with tempfile.TemporaryDirectory() as tmp_dir, disable_run_logger():
+        save_data.fn(
+            table,
+            str(Path(tmp_dir) / "launches.parquet"),
+            row_group_size=DATASET_MAX_ROWS_PER_GROUP,
+        )
+        save_data.fn(table, str(Path(tmp_dir) / "launches.arrow"))
+        del table
+
+        # Each read runs in its own process
+        for name in get_reads(tmp_dir):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_load_data", "--read"]
+                + [name, tmp_dir, str(nb_runs)],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+
+            duration, memory, nb_read = float(output[0]), float(output[1]), output[2]
+            print(
+                f"{name:<15}: {duration * 1000:8.1f} ms, "
+                f"{memory:8.1f} MiB allocated, {nb_read} rows"
+            )
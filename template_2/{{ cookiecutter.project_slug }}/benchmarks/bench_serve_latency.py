@@ -0,0 +1,142 @@
+"""
+Benchmark of the latency of the scheduled runs: process work pool vs long-lived mode
+
+- process: each run starts a new interpreter which imports the flow and runs
+  it, as the worker of the process work pool does (`prefect/deploy.sh`). It
+  is a lower bound: the worker also polls the API and loads the flow run.
+- serve: the runs are called in the same process (`serve.py`), the modules,
+  schemas, HTTP session and cache are kept between the runs.
+
+Each mode runs on a local stub of the launches API, with new data at each
+run (fingerprints and watermarks forgotten) and without (same data as the
+last run, nothing compacted or transformed). The flows run in a temporary
+directory (the data of the project is not touched) and need a Prefect API
+(`prefect server start`).
+
+Usage:
+    python -m benchmarks.bench_serve_latency [nb_records] [nb_runs] [delay_ms]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from pathlib import Path
+
+from core.libs.serve_utils import serve_flow
+from core.processing.orchestration import flow_rockets_launch, reset_clients
+from benchmarks.bench_flow_latency import start_stub_api, reset_ingestion_state
+from benchmarks.synthetic import make_launch_records
+
+# Run of the flow in a new interpreter (sources as JSON argument)
+PROCESS_RUN = (
+    "import sys, json\n"
+    "from core.processing.orchestration import flow_rockets_launch\n"
+    "flow_rockets_launch(sources=json.loads(sys.argv[1]))\n"
+)
+
+
+def run_process(sources, nb_runs, new_data):
+    """
+    Durations of the runs of the flow, each in a new interpreter
+
+    Args:
+        sources: sources of the flow
+        nb_runs: number of runs (after a first run to warm up)
+        new_data: forget the fingerprints and watermarks before each run
+
+    Returns:
+        list: duration of each run (seconds)
+    """
+    durations = []
+    for _ in range(nb_runs + 1):
+        if new_data:
+            reset_ingestion_state()
+
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", PROCESS_RUN, json.dumps(sources)],
+            capture_output=True,
+            check=True,
+        )
+        durations.append(time.perf_counter() - start)
+
+    return durations[1:]
+
+
+def run_serve(sources, nb_runs, new_data):
+    """
+    Durations of the runs of the flow, all in the current process
+
+    Args:
+        sources: sources of the flow
+        nb_runs: number of runs (after a first run to warm up)
+        new_data: forget the fingerprints and watermarks before each run
+
+    Returns:
+        list: duration of each run (seconds)
+    """
+    durations = []
+
+    def timed_flow(**kwargs):
+        if new_data:
+            reset_ingestion_state()
+
+        start = time.perf_counter()
+        state = flow_rockets_launch(**kwargs)
+        durations.append(time.perf_counter() - start)
+        return state
+
+    state = serve_flow(
+        timed_flow,
+        interval=0,
+        parameters={"sources": sources},
+        reset=reset_clients,
+        max_runs=nb_runs + 1,
+    )
+    if state.is_failed():
+        raise RuntimeError(f"Flow run failed: {state.message}")
+
+    return durations[1:]
+
+
+if __name__ == "__main__":
+
+    nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    nb_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    delay = (int(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    server = start_stub_api(make_launch_records(nb_records), delay)
+    sources = [
+        {
+            "name": "launches_api",
+            "path": f"http://127.0.0.1:{server.server_port}/launches/"
+            "?limit=100&offset=0&ordering=-last_updated&mode=list",
+            "schema": "raw",
+            "max_records": nb_records,
+        }
+    ]
+
+    print(f"{nb_records} records, {nb_runs} runs, {delay * 1000:.0f} ms per request")
+
+    # Run in a temporary directory, with the config of the project
+    project_dir = Path.cwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.symlink(project_dir / "core", Path(tmp_dir) / "core")
+        os.chdir(tmp_dir)
+
+        for new_data in [True, False]:
+            print("new data at each run" if new_data else "no new data")
+
+            for name, run in [("process", run_process), ("serve", run_serve)]:
+                durations = sorted(run(sources, nb_runs, new_data))
+                print(
+                    f"  {name:<8}: median {durations[len(durations) // 2]:.3f}s, "
+                    f"min {durations[0]:.3f}s, max {durations[-1]:.3f}s"
+                )
+
+        os.chdir(project_dir)
+
+    server.shutdown()
@@ -0,0 +1,107 @@
+"""
+Benchmark of the multi-source ingestion
+
+Compare the sources ingested one after another with the sources mapped
+over the task runner of the flow (one task per source), on local stubs of
+the launches API (one server per source, as distinct hosts) with a fixed
+delay per request.
+
+The flows run in a temporary directory (the data of the project is not
+touched) and need a Prefect API (`prefect server start`).
+
+Usage:
+    python -m benchmarks.bench_sources [nb_sources] [nb_records] [delay_ms]
+"""
+
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+from datetime import datetime, timezone
+
+from prefect import flow, unmapped
+
+from core.config.path import PATH_DATA_RAW
+from core.libs.utils import compact_dataset
+from core.processing.ingestion import ingest_source, task_ingest_source
+from core.processing.orchestration import get_task_runner
+from benchmarks.bench_flow_latency import start_stub_api, reset_ingestion_state
+from benchmarks.synthetic import make_launch_records
+
+
+@flow(name="bench_sources_sequential")
+def flow_sequential(sources: list):
+    """
+    Sources ingested one after another
+    """
+    ingested_at = datetime.now(timezone.utc)
+
+    partitions = []
+    for source in sources:
+        partitions += ingest_source(source, ingested_at)["partitions"]
+
+    compact_dataset(f"{PATH_DATA_RAW}/rockets_launches", partitions[:1])
+
+
+@flow(name="bench_sources_map")
+def flow_map(sources: list):
+    """
+    Sources mapped over the task runner (as in `flow_rockets_launch`)
+    """
+    ingestions = task_ingest_source.map(
+        sources, ingested_at=unmapped(datetime.now(timezone.utc))
+    )
+    results = ingestions.result()
+
+    compact_dataset(f"{PATH_DATA_RAW}/rockets_launches", results[0]["partitions"])
+
+
+if __name__ == "__main__":
+
+    nb_sources = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    nb_records = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    delay = (int(sys.argv[3]) if len(sys.argv) > 3 else 100) / 1000
+
+    records = make_launch_records(nb_records)
+    servers = [start_stub_api(records, delay) for _ in range(nb_sources)]
+    sources = [
+        {
+            "name": f"source_{i}",
+            "path": f"http://127.0.0.1:{server.server_port}/launches/?limit=100&offset=0",
+            "schema": "raw",
+        }
+        for i, server in enumerate(servers)
+    ]
+
+    flows = {
+        "sequential": flow_sequential,
+        "map": flow_map.with_options(task_runner=get_task_runner("thread")),
+    }
+
+    print(
+        f"{nb_sources} sources, {nb_records} records per source, "
+        f"{delay * 1000:.0f} ms per request"
+    )
+
+    # Run in a temporary directory, with the config of the project
+    project_dir = Path.cwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.symlink(project_dir / "core", Path(tmp_dir) / "core")
+        os.chdir(tmp_dir)
+
+        for name, bench_flow in flows.items():
+            reset_ingestion_state()
+            start = time.perf_counter()
+            bench_flow(sources=sources)
+            duration = time.perf_counter() - start
+
+            print(
+                f"{name:<10}: {duration:.3f}s -> "
+                f"{nb_sources * nb_records / duration:,.0f} records/s"
+            )
+
+        os.chdir(project_dir)
+
+    for server in servers:
+        server.shutdown()
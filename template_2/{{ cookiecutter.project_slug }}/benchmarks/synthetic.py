@@ -0,0 +1,53 @@
+"""
+Synthetic data for the benchmarks
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+
+STATUSES = ["Success", "Failure", "Partial Failure", "Go", "TBD"]
+
+
+def make_launch_records(nb_records, nb_countries=50, seed=42):
+    """
+    Make launch records shaped like the results of the launches API
+
+    Args:
+        nb_records: number of records
+        nb_countries: number of distinct countries
+        seed: seed of the random generator
+
+    Returns:
+        list: launch records
+    """
+    rng = random.Random(seed)
+    start = datetime(1957, 10, 4, tzinfo=timezone.utc)
+
+    records = []
+    for i in range(nb_records):
+        country = f"Country {rng.randrange(nb_countries)}"
+        net = start + timedelta(hours=rng.randrange(600_000))
+        mission = (
+            None
+            if rng.random() < 0.1
+            else {
+                "name": f"Mission {i}",
+                "type": rng.choice(["Communications", "Test"]),
+            }
+        )
+
+        records.append(
+            {
+                "id": f"{i:08x}-0000-0000-0000-000000000000",
+                "name": f"Rocket {i % 97} | Mission {i}",
+                "net": net.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "last_updated": net.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "status": {"id": 3, "abbrev": rng.choice(STATUSES)},
+                "launch_service_provider": {"id": 1, "name": f"Provider {i % 31}"},
+                "pad": {"name": f"Pad {i % 211}", "country": {"name": country}},
+                "rocket": {"configuration": {"name": f"Rocket {i % 97}"}},
+                "mission": mission,
+            }
+        )
+
+    return records
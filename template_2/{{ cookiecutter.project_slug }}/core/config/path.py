@@ -1,11 +1,14 @@
 # File with Paths for the project
 
 # paths data
-URL_API = "https://lldev.thespacedevs.com/2.3.0/launches/?limit=3&offset=10&ordering=-last_updated/?mode=list"
+URL_API = "https://lldev.thespacedevs.com/2.3.0/launches/?limit=100&offset=0&ordering=-last_updated&mode=list"
 PATH_DATA_RAW = "data/raw"
 PATH_DATA_PROCESSED = "data/processed"
+PATH_DATA_STATE = "data/state"
+PATH_DATA_CACHE = "data/cache/http"
 
 
 # path config
 PATH_CONFIG = "core/config"
 PATH_CONFIG_SCHEMA = "core/config/schemas.yaml"
+PATH_CONFIG_SOURCES = "core/config/sources.yaml"
@@ -0,0 +1,28 @@
+# File with Settings for the project
+
+# api settings
+API_MAX_RECORDS = 1000  # max records fetched per run (None to fetch everything)
+API_MAX_WORKERS = 4  # pages fetched concurrently
+API_MAX_PER_HOST = 4  # concurrent requests allowed on the same host
+API_RATE_LIMIT = 5  # max requests per second on the same host
+API_MAX_RETRIES = 5
+API_BACKOFF_FACTOR = 0.5  # sleep between retries: {backoff factor} * 2 ** (retry - 1)
+API_TIMEOUT = 30  # seconds
+API_CACHE_ENABLED = True  # conditional requests, responses cached on disk
+API_CACHE_MAX_BYTES = 256 * 1024 * 1024  # compressed responses kept on disk
+API_WATERMARK_FIELD = "last_updated"  # field of the incremental extraction
+
+# dataset settings
+DATASET_MAX_ROWS_PER_FILE = 1_000_000
+DATASET_MIN_ROWS_PER_GROUP = 16 * 1024
+DATASET_MAX_ROWS_PER_GROUP = 128 * 1024
+DATASET_COMPACT_MIN_FILES = 32  # compact a partition from this number of files
+CSV_BLOCK_SIZE = 8 * 1024 * 1024  # bytes of CSV parsed per batch (streaming mode)
+
+# state settings
+STATE_LEDGER_PARTITIONS = 256  # files of the launch stats ledger (a run writes only the files of its launches)
+
+# flow settings
+FLOW_TASK_RUNNER = "thread"  # thread (I/O bound tasks) or process (CPU bound tasks)
+FLOW_MAX_WORKERS = 4  # tasks running at the same time
+FLOW_SERVE_INTERVAL = 60  # seconds between the runs of the long-lived mode (serve.py)
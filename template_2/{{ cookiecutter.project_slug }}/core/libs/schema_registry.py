@@ -0,0 +1,184 @@
+"""
+Registry of the data schemas of the config YAML file
+
+The YAML file is parsed once, and the compiled schemas (PyArrow schema,
+column paths of the links) are cached by table name. The cache is reloaded
+when the modification time of the file changes. The PyArrow schema is
+built at its first use, pyarrow is not imported to read a schema.
+"""
+
+import os
+import threading
+
+import yaml
+
+# Paths
+from core.config.path import PATH_CONFIG_SCHEMA
+
+# Lazy imports: pyarrow is imported at its first use
+from core.libs.lazy_utils import lazy_import
+
+pa = lazy_import("pyarrow")
+
+# Cache: file path -> (modification time, compiled tables by name)
+_files = {}
+_lock = threading.Lock()
+
+
+def get_arrow_type(type_name):
+    """
+    Get the PyArrow type of a column type of the config YAML file
+
+    Args:
+        type_name (str): integer, float, string, datetime or bool
+
+    Returns:
+        pa.DataType: PyArrow type
+    """
+    return {
+        "integer": pa.int64,
+        "float": pa.float64,
+        "string": pa.string,
+        "datetime": lambda: pa.timestamp("ns", tz="UTC"),
+        "bool": pa.bool_,
+    }[type_name]()
+
+
+def build_arrow_schema(data_schema):
+    """
+    Build the PyArrow schema of a table from its schema in the YAML file
+
+    Args:
+        data_schema (dict): Schema of the table
+
+    Returns:
+        pa.Schema: PyArrow schema of the table
+    """
+    return pa.schema(
+        [(col["name"], get_arrow_type(col["type"])) for col in data_schema["columns"]]
+    )
+
+
+def build_column_paths(data_schema):
+    """
+    Compile the `link` of each column into a tuple of keys
+
+    Args:
+        data_schema (dict): Schema of the table
+
+    Returns:
+        tuple: (name, keys) of each column with a link
+    """
+    return tuple(
+        (col["name"], tuple(col["link"].split(".")))
+        for col in data_schema["columns"]
+        if "link" in col
+    )
+
+
+def _load_file(file_path):
+    """
+    Parse the YAML file and compile its tables, if it changed since last load
+    """
+    mtime = os.stat(file_path).st_mtime_ns
+
+    with _lock:
+        cached = _files.get(file_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with open(file_path, "r") as file:
+            config = yaml.safe_load(file)
+
+        tables = {
+            table["name"]: {
+                "schema": table,
+                "arrow_schema": None,
+                "column_paths": build_column_paths(table),
+            }
+            for table in config["datamodel"]["tables"]
+        }
+
+        _files[file_path] = (mtime, tables)
+        return tables
+
+
+def get_table(table_name, file_path=PATH_CONFIG_SCHEMA):
+    """
+    Get the compiled schema of a table
+
+    Args:
+        table_name (str): Name of the table
+        file_path (str): Path to the YAML file
+
+    Returns:
+        dict: schema, arrow_schema (built by `get_arrow_schema`) and column_paths
+            of the table, None if not found
+    """
+    return _load_file(file_path).get(table_name)
+
+
+def get_schema(table_name, file_path=PATH_CONFIG_SCHEMA):
+    """
+    Get the schema of a table, as described in the YAML file
+
+    Args:
+        table_name (str): Name of the table
+        file_path (str): Path to the YAML file
+
+    Returns:
+        dict: Schema of the table, empty if not found
+    """
+    table = get_table(table_name, file_path)
+    return table["schema"] if table else {}
+
+
+def _find_compiled(data_schema):
+    """
+    Find the compiled table of a schema in the cache
+    """
+    for _, tables in list(_files.values()):
+        table = tables.get(data_schema.get("name"))
+        if table is not None and (
+            table["schema"] is data_schema or table["schema"] == data_schema
+        ):
+            return table
+
+    return None
+
+
+def get_arrow_schema(data_schema):
+    """
+    Get the PyArrow schema of a table, from the cache when the schema comes
+    from the registry
+
+    Args:
+        data_schema (dict): Schema of the table
+
+    Returns:
+        pa.Schema: PyArrow schema of the table
+    """
+    table = _find_compiled(data_schema)
+    if table is None:
+        return build_arrow_schema(data_schema)
+
+    # Built at the first use (the same schema if two threads build it)
+    if table["arrow_schema"] is None:
+        table["arrow_schema"] = build_arrow_schema(data_schema)
+
+    return table["arrow_schema"]
+
+
+def get_column_paths(data_schema):
+    """
+    Get the compiled column paths of a table, from the cache when the schema
+    comes from the registry
+
+    Args:
+        data_schema (dict): Schema of the table
+
+    Returns:
+        tuple: (name, keys) of each column with a link
+    """
+    table = _find_compiled(data_schema)
+    return table["column_paths"] if table else build_column_paths(data_schema)
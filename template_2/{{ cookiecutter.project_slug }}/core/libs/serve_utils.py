@@ -0,0 +1,78 @@
+"""
+Long-lived mode of the flow: the scheduled runs are called in one process
+
+With the process work pool (`prefect/deploy.sh`), each run of the schedule
+starts a new interpreter: the modules are imported again, the config YAML
+files are read again, and the HTTP session (and the database pool) are
+opened again. `flow.serve()` also starts a new process for each run.
+
+In the long-lived mode (`serve.py`), the runs are called one after another
+in the same process, every `FLOW_SERVE_INTERVAL` seconds. The caches of the
+modules (schema registry, HTTP session and cache, database engines, dbt
+manifest) are kept between the runs. The per-run state is not kept in
+memory: the artifact entries are popped at the end of each run, the
+watermarks and fingerprints are files. After a failed run, the shared
+clients are reset, the next run opens new connections.
+
+The runs are not attached to a deployment, they are listed with the flow in
+the Prefect UI.
+"""
+
+import time
+
+# Prefect
+from prefect.logging import get_logger
+
+# Settings
+from core.config.settings import FLOW_SERVE_INTERVAL
+
+
+def serve_flow(
+    flow, interval=FLOW_SERVE_INTERVAL, parameters=None, reset=None, max_runs=None
+):
+    """
+    Run a flow every `interval` seconds in the current process
+
+    The runs never overlap: a run longer than the interval delays the next
+    one, the runs missed meanwhile are skipped. The clients are reset after
+    a failed run and when the loop stops (Ctrl+C).
+
+    Args:
+        flow: flow to run
+        interval: seconds between the starts of two runs
+        parameters: parameters of the flow
+        reset: function closing the clients shared by the runs
+        max_runs: number of runs before returning (None to run forever)
+
+    Returns:
+        State: final state of the last run
+    """
+    logger = get_logger("serve")
+    parameters = parameters or {}
+
+    state = None
+    nb_runs = 0
+    next_run = time.monotonic()
+
+    try:
+        while max_runs is None or nb_runs < max_runs:
+            time.sleep(max(0.0, next_run - time.monotonic()))
+
+            state = flow(**parameters, return_state=True)
+            nb_runs += 1
+
+            # Failed run -> connections may be broken, the next run opens new ones
+            if state.is_failed() and reset is not None:
+                logger.warning(f"Run {nb_runs} failed ({state.message}), clients reset")
+                reset()
+
+            # Next run on the schedule, skip the runs missed by a long run
+            next_run += interval
+            now = time.monotonic()
+            if interval and next_run < now:
+                next_run += ((now - next_run) // interval + 1) * interval
+    finally:
+        if reset is not None:
+            reset()
+
+    return state
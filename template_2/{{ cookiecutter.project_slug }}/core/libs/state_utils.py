@@ -0,0 +1,188 @@
+"""
+State utilities: small state files persisted between the runs
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from pathlib import Path
+
+# Lazy imports: pyarrow is imported at its first use
+from core.libs.lazy_utils import lazy_import
+
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+pq = lazy_import("pyarrow.parquet")
+
+# Paths
+from core.config.path import PATH_DATA_STATE
+
+
+def read_state(name: str, default=None):
+    """
+    Read a JSON state
+
+    Args:
+        name: name of the state
+        default: value returned when the state does not exist
+
+    Returns:
+        value of the state
+    """
+    path = Path(PATH_DATA_STATE) / f"{name}.json"
+
+    if not path.exists():
+        return default
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_state(name: str, value):
+    """
+    Write a JSON state, atomically (written next to the state and moved in place)
+
+    Args:
+        name: name of the state
+        value: JSON serializable value
+    """
+    path = Path(PATH_DATA_STATE) / f"{name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(value, f)
+
+    tmp_path.replace(path)
+
+
+def read_state_table(name: str, schema: pa.Schema) -> pa.Table:
+    """
+    Read a table state
+
+    Args:
+        name: name of the state
+        schema: schema of the table, used when the state does not exist
+
+    Returns:
+        pa.Table: table of the state (empty if it does not exist)
+    """
+    path = Path(PATH_DATA_STATE) / f"{name}.parquet"
+
+    if not path.exists():
+        return schema.empty_table()
+
+    return pq.read_table(path, schema=schema)
+
+
+def write_state_table(name: str, table: pa.Table):
+    """
+    Write a table state, atomically (written next to the state and moved in place)
+
+    Args:
+        name: name of the state
+        table: table of the state
+    """
+    path = Path(PATH_DATA_STATE) / f"{name}.parquet"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    pq.write_table(table, tmp_path)
+
+    tmp_path.replace(path)
+
+
+def state_partition(key, nb_partitions: int) -> int:
+    """
+    Get the partition of a key in a partitioned table state (the same in
+    every run)
+
+    Args:
+        key: value of the key
+        nb_partitions: number of partitions of the state
+
+    Returns:
+        int: partition of the key
+    """
+    return zlib.crc32(str(key).encode()) % nb_partitions
+
+
+def state_partition_name(name: str, partition: int, version: int) -> str:
+    """
+    Get the name of a version of a partition of a partitioned table state
+
+    Args:
+        name: name of the state
+        partition: partition
+        version: version of the partition
+
+    Returns:
+        str: name of the table state of the partition
+    """
+    return f"{name}/{partition:04d}-{version:06d}"
+
+
+def read_state_partitions(name: str, schema: pa.Schema, versions: dict) -> pa.Table:
+    """
+    Read some partitions of a partitioned table state (one file per version
+    of a partition, in the directory of the state)
+
+    Args:
+        name: name of the state
+        schema: schema of the table
+        versions: version to read of each partition
+
+    Returns:
+        pa.Table: rows of the partitions (empty if they do not exist)
+    """
+    tables = [
+        read_state_table(state_partition_name(name, partition, version), schema)
+        for partition, version in sorted(versions.items())
+    ]
+
+    return pa.concat_tables([schema.empty_table(), *tables])
+
+
+def write_state_partitions(
+    name: str, table: pa.Table, key: str, nb_partitions: int, partitions, version: int
+):
+    """
+    Write a new version of some partitions of a partitioned table state, the
+    other partitions and the previous versions are not touched
+
+    Args:
+        name: name of the state
+        table: rows of the partitions
+        key: column of the key of the partitions
+        nb_partitions: number of partitions of the state
+        partitions: partitions to write (a partition without rows is emptied)
+        version: version of the partitions written
+    """
+    table_partitions = pa.array(
+        [state_partition(value, nb_partitions) for value in table[key].to_pylist()],
+        type=pa.int64(),
+    )
+
+    for partition in sorted(partitions):
+        write_state_table(
+            state_partition_name(name, partition, version),
+            table.filter(pc.equal(table_partitions, partition)),
+        )
+
+
+def remove_state_tables(name: str, keep):
+    """
+    Remove the table states of the directory of a state, except some
+
+    Args:
+        name: name of the state (directory)
+        keep: names of the table states kept
+    """
+    keep_paths = {
+        Path(PATH_DATA_STATE) / f"{table_name}.parquet" for table_name in keep
+    }
+
+    for path in (Path(PATH_DATA_STATE) / name).glob("*.parquet*"):
+        if path not in keep_paths:
+            path.unlink()
@@ -1,46 +1,118 @@
-import yaml
+from __future__ import annotations
+
+import uuid
+import hashlib
+import shutil
+import threading
+from collections import defaultdict
 from pathlib import Path
-import pyarrow as pa
-import pyarrow.csv as csv
-import pyarrow.parquet as pq
-import pyarrow.compute as pc
-import pyarrow.dataset as ds
-import requests
 import json
+import yaml
 from typing import Dict, List, Any, Union
 
 from prefect import task
 from prefect.logging import get_run_logger
-from prefect.variables import Variable
+from prefect.context import FlowRunContext
+from prefect.runtime import flow_run
 from prefect.artifacts import create_table_artifact
 
+# Lazy imports: pyarrow is imported at its first use
+from core.libs.lazy_utils import lazy_import
+
+pa = lazy_import("pyarrow")
+csv = lazy_import("pyarrow.csv")
+paj = lazy_import("pyarrow.json")
+pq = lazy_import("pyarrow.parquet")
+pc = lazy_import("pyarrow.compute")
+ds = lazy_import("pyarrow.dataset")
+feather = lazy_import("pyarrow.feather")
+pafs = lazy_import("pyarrow.fs")
+
+# Api utils
+from core.libs.api_utils import fetch_json, iter_pages, iter_updated_pages, Watermark
+
+# Schema registry
+from core.libs.schema_registry import get_arrow_schema, get_schema
+
+# Paths
+from core.config.path import PATH_CONFIG_SOURCES
+
+# Settings
+from core.config.settings import (
+    DATASET_MAX_ROWS_PER_FILE,
+    DATASET_MIN_ROWS_PER_GROUP,
+    DATASET_MAX_ROWS_PER_GROUP,
+    DATASET_COMPACT_MIN_FILES,
+    CSV_BLOCK_SIZE,
+)
 
-@task(
-    name="update_data_artifact",
-    description="Update data artifact",
-    task_run_name="update-data-artifact",
+# Entries of the data artifact, by flow run id
+_artifact_entries = defaultdict(list)
+_artifact_lock = threading.Lock()
+
+# Formats tried for the datetime values which are not ISO 8601
+DATETIME_FORMATS = [
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+]
+
+# ISO 8601 datetimes, with or without a timezone, cast by Arrow (also with
+# fractional seconds)
+ISO_DATETIME_PATTERN = (
+    r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,9})?)?(Z|[+-]\d{2}(:?\d{2})?)?$"
 )
+ISO_ZONE_PATTERN = r"(Z|[+-]\d{2}(:?\d{2})?)$"
+
+
+def add_artifact_entry(run_id, entry):
+    """
+    Add an entry to the data artifact of a flow run
+
+    Args:
+        run_id: id of the flow run
+        entry: row of the artifact
+    """
+    with _artifact_lock:
+        _artifact_entries[run_id].append(entry)
+
+
+def pop_artifact_entries(run_id):
+    """
+    Remove and return the entries of the data artifact of a flow run
+
+    Args:
+        run_id: id of the flow run
+
+    Returns:
+        list: rows of the artifact
+    """
+    with _artifact_lock:
+        return _artifact_entries.pop(run_id, [])
+
+
 def upd_data_artifact(info, data):
     """
     Update Artifact
 
-    - Retrieve the artifact from the Prefect Variable
-    - Add data to the artifact
-        - Save the artifact back to the Prefect Variable
+    - Add data to the entries of the current flow run (in memory)
+    - The entries are published once, by `save_artifact` at the end of the flow
+
+    In a task worker of the process pool task runner (flow run context
+    detached from the flow process), the entries of the flow are not
+    reachable: the data is published right away, with the task run.
 
     Args:
         info: information
         data: data to add
     """
+    flow_run_context = FlowRunContext.get()
+    if flow_run_context is not None and flow_run_context.detached:
+        create_table_artifact(table=[{"info": info, "data": data}])
+        return
 
-    # get varoaible
-    data_artifact = Variable.get("data_artifact", default=[])
-
-    # add data
-    data_artifact.append({"info": info, "data": data})
-
-    # save variable
-    Variable.set("data_artifact", data_artifact, overwrite=True)
+    add_artifact_entry(flow_run.id, {"info": info, "data": data})
 
 
 @task(
@@ -52,16 +124,19 @@ def save_artifact(key_name: str):
     """
     Save artifact in Prefect for the Flow
 
-    - Retrieve the artifact from the Prefect Variable
-    - save the artifact with the data
-    - Reset the Prefect Variable for the next run
+    - Retrieve the entries of the current flow run
+    - save the artifact with the data (a single table artifact)
+    - Drop the entries of the run
 
     Args:
         key: key of artifact (name of the artifact)
     """
 
     # get data
-    data_artifact = Variable.get("data_artifact", default=[])
+    data_artifact = pop_artifact_entries(flow_run.id)
+
+    if not data_artifact:
+        return
 
     # create data
     create_table_artifact(
@@ -69,30 +144,54 @@ def save_artifact(key_name: str):
         table=data_artifact,
     )
 
-    # reset variable
-    Variable.set("data_artifact", [], overwrite=True)
-
 
 @task(
     name="get_data_api",
     description="Get data from API",
     task_run_name="get-data-api-{url}",
 )
-def get_data_api(url: str, **kwargs) -> dict:
+def get_data_api(
+    url: str,
+    paginate: bool = False,
+    max_records: int = None,
+    watermark: Watermark = None,
+    **kwargs,
+) -> list:
     """
     Get data from API
 
+    With `paginate`, the pages of the API are followed (`limit/offset` or `next`)
+    and fetched concurrently, see `core.libs.api_utils.iter_pages`.
+
+    With a `watermark`, only the records updated since the watermark are
+    fetched, see `core.libs.api_utils.iter_updated_pages`.
+
     Args:
         url: URL of the API
+        paginate: follow the pagination of the API
+        max_records: max number of records to fetch when paginating (None for all)
+        watermark: watermark of an incremental extraction (with `paginate`)
         kwargs: additional parameters for the request
 
     Returns:
-        dict: JSON response from the API
+        list: records from the API
     """
     try:
-        response = requests.get(url, **kwargs)
-        response.raise_for_status()  # Raise an error for bad responses
-        return response.json()["results"]
+        if not paginate:
+            return fetch_json(url, **kwargs)["results"]
+
+        if watermark is not None:
+            pages = iter_updated_pages(
+                url, watermark, max_records=max_records, **kwargs
+            )
+        else:
+            pages = iter_pages(url, max_records=max_records, **kwargs)
+
+        data = []
+        for records in pages:
+            data.extend(records)
+
+        return data
 
     except Exception as e:
         raise ValueError(f"Error fetching data from API: {str(e)}")
@@ -108,29 +207,71 @@ def load_data(file_path: str, **kwargs) -> pa.Table:
     Load data from various file_paths (API endpoint, CSV or Parquet file).
 
     The function automatically detects the type of file_path based on the file_path parameter:
+    - directories are loaded as Parquet datasets (hive partitioning), or
+      Arrow IPC datasets with `format="ipc"`
     - file_path ending with '.csv' are loaded as CSV files
     - file_path ending with '.parquet' or '.pq' are loaded as Parquet files
-    - file_path ending with '.json' are loaded as JSON files
+    - file_path ending with '.arrow', '.feather' or '.ipc' are loaded as
+      Arrow IPC (Feather V2) files
+    - file_path ending with '.json' are loaded as JSON files (array of objects)
+    - file_path ending with '.jsonl' or '.ndjson' are loaded as JSON Lines files
+
+    Only the `columns` are read and the rows are filtered with `filter`
+    (datasets, CSV, Parquet and Arrow IPC files). For the Parquet files and
+    datasets, the filter is pushed down to the partitions and to the row
+    groups (min/max statistics), the other row groups are never read. The
+    files are memory mapped (`memory_map`): an uncompressed Arrow IPC file
+    is read without copy.
 
     Args:
         file_path: file_path of the data (URL or file path)
         kwargs: Additional parameters for the loading function
+            - columns: columns to read (default: all)
+            - filter: filter of the rows, a `pyarrow.compute` expression
+            - memory_map: memory map the files (default: True)
+            - stream: return an iterator of record batches instead of a
+              table, see `iter_data_batches`
 
     Returns:
         PyArrow Table containing the loaded data
+        (iterator of PyArrow RecordBatches with `stream`)
     """
     # Get logger
     logger = get_run_logger()
 
     logger.info(f"Loading data from {file_path}")
 
+    # Streaming mode -> the batches are read on demand
+    if kwargs.get("stream"):
+        logger.info(f"Streaming data from {file_path}")
+        return iter_data_batches(file_path, **kwargs)
+
+    # Projection, filter and memory mapping
+    columns = kwargs.get("columns")
+    row_filter = kwargs.get("filter")
+    memory_map = kwargs.get("memory_map", True)
+
     try:
         # Detect the file_path type
-        if file_path.endswith(".csv"):
+        if Path(file_path).is_dir():
+            dataset_format = kwargs.get("format", "parquet")
+            logger.info(f"Detected {dataset_format} dataset: {file_path}")
+            dataset = ds.dataset(
+                file_path,
+                format=dataset_format,
+                partitioning=kwargs.get("partitioning", "hive"),
+                filesystem=pafs.LocalFileSystem(use_mmap=memory_map),
+            )
+
+            table = dataset.to_table(columns=columns, filter=row_filter)
+
+        elif file_path.endswith(".csv"):
             logger.info(f"Detected CSV file: {file_path}")
             read_options = kwargs.get("read_options", csv.ReadOptions())
             parse_options = kwargs.get("parse_options", csv.ParseOptions())
-            convert_options = kwargs.get("convert_options", csv.ConvertOptions())
+            convert_options = kwargs.get(
+                "convert_options", csv.ConvertOptions(include_columns=columns)
+            )
 
             table = csv.read_csv(
                 file_path,
@@ -139,27 +280,58 @@ def load_data(file_path: str, **kwargs) -> pa.Table:
                 convert_options=convert_options,
             )
 
+            if row_filter is not None:
+                table = table.filter(row_filter)
+
         elif file_path.endswith((".parquet", ".pq")):
             logger.info(f"Detected Parquet file: {file_path}")
-            table = pq.read_table(file_path)
+            table = pq.read_table(
+                file_path,
+                columns=columns,
+                filters=row_filter,
+                memory_map=memory_map,
+            )
+
+        elif file_path.endswith((".arrow", ".feather", ".ipc")):
+            logger.info(f"Detected Arrow IPC file: {file_path}")
+            # The IPC reader maps the buffers of the file, no copy
+            source = pa.memory_map(file_path) if memory_map else pa.OSFile(file_path)
+            with source:
+                table = pa.ipc.open_file(source).read_all()
+
+            if columns is not None:
+                table = table.select(columns)
+
+            if row_filter is not None:
+                table = table.filter(row_filter)
+
+        elif file_path.endswith((".jsonl", ".ndjson")):
+            logger.info(f"Detected JSON Lines file: {file_path}")
+            # Multi-threaded JSON reader of PyArrow, nested objects -> struct columns
+            read_options = kwargs.get("read_options", paj.ReadOptions())
+            parse_options = kwargs.get("parse_options", paj.ParseOptions())
+
+            table = paj.read_json(
+                file_path, read_options=read_options, parse_options=parse_options
+            )
 
         elif file_path.endswith(".json"):
             logger.info(f"Detected JSON file: {file_path}")
-            # PyArrow doesn't have direct JSON file support, so we read and convert
+            # PyArrow only reads JSON Lines, so we read the JSON array and convert
             with open(file_path, "r") as f:
                 data = json.load(f)
 
             # Convert JSON to PyArrow Table
             if isinstance(data, list) and len(data) > 0:
-                # Assuming all items have the same structure
-                table = pa.Table.from_pylist(data)
+                # Nested objects -> struct columns, types inferred on all the items
+                table = pa.Table.from_struct_array(pa.array(data))
             else:
                 logger.warning(f"Empty or invalid JSON data in {file_path}")
                 return pa.Table.from_pylist([])
 
         else:
             raise ValueError(
-                f"Unsupported file_path type for {file_path}. Supported types: JSON, CSV, Parquet"
+                f"Unsupported file_path type for {file_path}. Supported types: JSON, JSON Lines, CSV, Parquet, Arrow IPC"
             )
 
         # Check if the table is empty
@@ -177,6 +349,64 @@ def load_data(file_path: str, **kwargs) -> pa.Table:
         raise
 
 
+def iter_data_batches(file_path: str, **kwargs):
+    """
+    Iterate over the record batches of a file or a dataset, with bounded memory
+
+    The file is scanned with `pyarrow.dataset`: the blocks are read ahead and
+    decoded on the Arrow thread pool, only a few blocks are in memory at any
+    time. CSV files are read in blocks of `block_size` bytes. The projection
+    (`columns`) and the filter are applied during the scan.
+
+    Args:
+        file_path: path of a CSV, JSON Lines, Parquet or Arrow IPC file, or of
+            a dataset
+        kwargs: Additional parameters for the scan
+            - columns: columns to read (default: all)
+            - filter: filter of the rows, a `pyarrow.compute` expression
+            - block_size: bytes of CSV parsed per batch (default: CSV_BLOCK_SIZE)
+            - memory_map: memory map the files (default: Parquet and Arrow IPC)
+
+    Yields:
+        pa.RecordBatch: batches of the data
+    """
+    if Path(file_path).is_dir():
+        file_format = kwargs.get("format", "parquet")
+    elif file_path.endswith(".csv"):
+        file_format = ds.CsvFileFormat(
+            read_options=csv.ReadOptions(
+                block_size=kwargs.get("block_size", CSV_BLOCK_SIZE)
+            ),
+            parse_options=kwargs.get("parse_options", csv.ParseOptions()),
+            convert_options=kwargs.get("convert_options", csv.ConvertOptions()),
+        )
+    elif file_path.endswith((".parquet", ".pq")):
+        file_format = "parquet"
+    elif file_path.endswith((".arrow", ".feather", ".ipc")):
+        file_format = "ipc"
+    elif file_path.endswith((".jsonl", ".ndjson")):
+        file_format = ds.JsonFileFormat()
+    else:
+        raise ValueError(
+            f"Unsupported file_path type for a stream {file_path}. Supported types: CSV, JSON Lines, Parquet, Arrow IPC"
+        )
+
+    # Text files are read block by block, a memory map would keep the pages
+    # of the whole file in memory
+    memory_map = kwargs.get("memory_map", file_format in ("parquet", "ipc"))
+
+    dataset = ds.dataset(
+        file_path,
+        format=file_format,
+        partitioning=kwargs.get("partitioning", "hive"),
+        filesystem=pafs.LocalFileSystem(use_mmap=memory_map),
+    )
+
+    yield from dataset.to_batches(
+        columns=kwargs.get("columns"), filter=kwargs.get("filter"), use_threads=True
+    )
+
+
 @task(
     name="save_data",
     description="Save PyArrow Table to file",
@@ -186,13 +416,33 @@ def save_data(table: pa.Table, file_path: str, **kwargs) -> str:
     """
     Save a PyArrow Table to a file.
 
+    An iterable of PyArrow RecordBatches (e.g. `load_data(..., stream=True)`)
+    is written batch by batch to a CSV or Parquet file, the memory is bounded
+    by one batch.
+
     Args:
-        table: PyArrow Table to save
+        table: PyArrow Table (or iterable of RecordBatches) to save
         file_path: Path to save the file
     """
     # Get logger
     logger = get_run_logger()
 
+    # Streaming mode -> the batches are written one by one
+    if not isinstance(table, pa.Table):
+        logger.info(f"Saving a stream of batches to {file_path}")
+
+        if file_path.endswith(".csv"):
+            nb_rows = write_csv_batches(table, file_path, **kwargs)
+        elif file_path.endswith((".parquet", ".pq")):
+            nb_rows = write_parquet_batches(table, file_path, **kwargs)
+        else:
+            raise ValueError(
+                f"Unsupported file_path type for a stream {file_path}. Supported types: CSV, Parquet"
+            )
+
+        logger.info(f"Save Success: {nb_rows} rows to {file_path}")
+        return file_path
+
     if table.num_rows == 0:
         logger.warning(f"Table is empty, nothing to save to {file_path}")
         return
@@ -209,6 +459,11 @@ def save_data(table: pa.Table, file_path: str, **kwargs) -> str:
         elif file_path.endswith((".parquet", ".pq")):
             # Write to Parquet
             pq.write_table(table, file_path, **kwargs)
+        elif file_path.endswith((".arrow", ".feather", ".ipc")):
+            # Write to Arrow IPC, uncompressed by default: memory mapped
+            # without copy by `load_data`
+            kwargs.setdefault("compression", "uncompressed")
+            feather.write_feather(table, file_path, **kwargs)
 
         logger.info(f"Save Success: {file_path}")
         return file_path
@@ -217,6 +472,348 @@ def save_data(table: pa.Table, file_path: str, **kwargs) -> str:
         raise
 
 
+def write_dataset_batches(
+    batches, base_dir: str, schema: pa.Schema, partition_cols: list = None, **kwargs
+) -> int:
+    """
+    Append a stream of PyArrow RecordBatches to a partitioned Parquet dataset.
+
+    The new fragments are written in a staging directory (ignored by the
+    readers, its name starts with a dot) and each file is moved in place
+    once complete, so a reader never sees a partial file. The file names
+    are unique per write, the existing fragments are never overwritten.
+
+    Args:
+        batches: iterable of PyArrow RecordBatches
+        base_dir: root directory of the dataset
+        schema: schema of the batches
+        partition_cols: columns of the hive partitioning
+        kwargs: Additional parameters for `pyarrow.dataset.write_dataset`
+
+    Returns:
+        int: number of rows written
+    """
+    write_id = uuid.uuid4().hex
+    staging_dir = Path(base_dir) / ".staging" / write_id
+    nb_rows = 0
+
+    def count_rows(batches):
+        nonlocal nb_rows
+        for batch in batches:
+            nb_rows += batch.num_rows
+            yield batch
+
+    try:
+        ds.write_dataset(
+            count_rows(batches),
+            staging_dir,
+            schema=schema,
+            format="parquet",
+            partitioning=partition_cols,
+            partitioning_flavor="hive" if partition_cols else None,
+            basename_template="part-" + write_id + "-{i}.parquet",
+            max_rows_per_file=kwargs.pop(
+                "max_rows_per_file", DATASET_MAX_ROWS_PER_FILE
+            ),
+            min_rows_per_group=kwargs.pop(
+                "min_rows_per_group", DATASET_MIN_ROWS_PER_GROUP
+            ),
+            max_rows_per_group=kwargs.pop(
+                "max_rows_per_group", DATASET_MAX_ROWS_PER_GROUP
+            ),
+            **kwargs,
+        )
+
+        # Publish the fragments
+        for file in sorted(staging_dir.rglob("*.parquet")):
+            dest = Path(base_dir) / file.relative_to(staging_dir)
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            file.replace(dest)
+
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return nb_rows
+
+
+def compact_dataset_dir(data_dir: str, min_files: int = DATASET_COMPACT_MIN_FILES):
+    """
+    Compact the fragments of a dataset directory (e.g. a partition) into
+    large files, when it holds at least `min_files` fragments.
+
+    The compacted files are published before the small ones are deleted,
+    a reader may see both for a moment, but never misses data.
+
+    Args:
+        data_dir: directory of the fragments (not recursive)
+        min_files: min number of fragments to compact
+
+    Returns:
+        int: number of fragments compacted
+    """
+    files = sorted(Path(data_dir).glob("*.parquet"))
+    if len(files) < min_files:
+        return 0
+
+    dataset = ds.dataset([str(file) for file in files], format="parquet")
+    write_dataset_batches(dataset.to_batches(), data_dir, dataset.schema)
+
+    for file in files:
+        file.unlink()
+
+    return len(files)
+
+
+@task(
+    name="compact_dataset",
+    description="Compact the partitions of a dataset",
+    task_run_name="compact-dataset-{base_dir}",
+)
+def compact_dataset(base_dir: str, partitions: list) -> int:
+    """
+    Compact the partitions of a dataset which hold too many small fragments
+
+    Args:
+        base_dir: root directory of the dataset
+        partitions: values of the partition columns of each partition,
+            e.g. [{"ingestion_date": "2025-01-01"}]
+
+    Returns:
+        int: number of fragments compacted
+    """
+    # Get logger
+    logger = get_run_logger()
+
+    nb_compacted = 0
+    for partition in partitions:
+        partition_dir = Path(base_dir).joinpath(
+            *[f"{col}={value}" for col, value in partition.items()]
+        )
+        nb_files = compact_dataset_dir(partition_dir)
+        if nb_files:
+            logger.info(f"Compacted {nb_files} fragments of {partition_dir}")
+        nb_compacted += nb_files
+
+    return nb_compacted
+
+
+@task(
+    name="save_dataset",
+    description="Append PyArrow Table to a partitioned dataset",
+    task_run_name="save-dataset-{base_dir}",
+)
+def save_dataset(
+    table: pa.Table,
+    base_dir: str,
+    partition_cols: list = None,
+    compact: bool = True,
+    **kwargs,
+) -> str:
+    """
+    Append a PyArrow Table to a partitioned Parquet dataset.
+
+    - Write the new fragments (see `write_dataset_batches`)
+    - Compact the partitions which hold too many small fragments
+
+    Args:
+        table: PyArrow Table to save
+        base_dir: root directory of the dataset
+        partition_cols: columns of the hive partitioning
+        compact: compact the partitions written (disable it when several
+            tasks write the same partitions, and run `compact_dataset` once)
+        kwargs: Additional parameters for `pyarrow.dataset.write_dataset`
+    """
+    # Get logger
+    logger = get_run_logger()
+
+    if table.num_rows == 0:
+        logger.warning(f"Table is empty, nothing to save to {base_dir}")
+        return
+
+    logger.info(f"Saving {table.num_rows} data to {base_dir}")
+
+    try:
+        write_dataset_batches(
+            table.to_batches(), base_dir, table.schema, partition_cols, **kwargs
+        )
+
+        # Compact the partitions written
+        if partition_cols and compact:
+            partitions = (
+                table.select(partition_cols).group_by(partition_cols).aggregate([])
+            )
+            compact_dataset.fn(base_dir, partitions.to_pylist())
+
+        logger.info(f"Save Success: {base_dir}")
+        return base_dir
+    except Exception as e:
+        logger.error(f"Error saving Table to {base_dir}: {str(e)}")
+        raise
+
+
+def write_parquet_batches(batches, file_path: str, **kwargs) -> int:
+    """
+    Write a stream of PyArrow RecordBatches to a Parquet file.
+
+    Batches are written one by one, so the memory is bounded by one batch.
+    The file is written next to the destination and moved in place at the
+    end, a failed stream never leaves a partial file.
+
+    Args:
+        batches: iterable of PyArrow RecordBatches
+        file_path: Path to save the file
+        kwargs: Additional parameters for the Parquet writer
+
+    Returns:
+        int: number of rows written
+    """
+    tmp_path = f"{file_path}.tmp"
+    writer = None
+    nb_rows = 0
+
+    try:
+        for batch in batches:
+            if writer is None:
+                Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+                writer = pq.ParquetWriter(tmp_path, batch.schema, **kwargs)
+
+            # All the batches must share the schema of the first one
+            if batch.schema != writer.schema:
+                batch = pa.Table.from_batches([batch]).cast(writer.schema)
+
+            writer.write(batch)
+            nb_rows += batch.num_rows
+
+        if writer is not None:
+            writer.close()
+            Path(tmp_path).replace(file_path)
+
+        return nb_rows
+
+    except Exception:
+        if writer is not None:
+            writer.close()
+            Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def write_csv_batches(batches, file_path: str, **kwargs) -> int:
+    """
+    Write a stream of PyArrow RecordBatches to a CSV file.
+
+    Batches are written one by one, so the memory is bounded by one batch.
+    The file is written next to the destination and moved in place at the
+    end, a failed stream never leaves a partial file.
+
+    Args:
+        batches: iterable of PyArrow RecordBatches
+        file_path: Path to save the file
+        kwargs: Additional parameters for the CSV writer (`write_options`)
+
+    Returns:
+        int: number of rows written
+    """
+    tmp_path = f"{file_path}.tmp"
+    writer = None
+    schema = None
+    nb_rows = 0
+
+    try:
+        for batch in batches:
+            if writer is None:
+                Path(file_path).parent.mkdir(parents=True, exist_ok=True)
+                schema = batch.schema
+                writer = csv.CSVWriter(tmp_path, schema, **kwargs)
+
+            # All the batches must share the schema of the first one
+            if batch.schema != schema:
+                batch = pa.Table.from_batches([batch]).cast(schema)
+
+            writer.write(batch)
+            nb_rows += batch.num_rows
+
+        if writer is not None:
+            writer.close()
+            Path(tmp_path).replace(file_path)
+
+        return nb_rows
+
+    except Exception:
+        if writer is not None:
+            writer.close()
+            Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+def drop_duplicates(table: pa.Table, keys: list) -> pa.Table:
+    """
+    Drop the duplicated rows of a table, the last row of each key is kept.
+
+    Args:
+        table: PyArrow Table
+        keys: columns identifying a row
+
+    Returns:
+        PyArrow Table without duplicated keys
+    """
+    indices = (
+        table.select(keys)
+        .append_column("_index", pa.array(range(table.num_rows), type=pa.int64()))
+        .group_by(keys, use_threads=False)
+        .aggregate([("_index", "max")])
+    )
+
+    return table.take(indices["_index_max"])
+
+
+class _DigestSink:
+    """
+    Writable file which feeds a hash instead of storing the bytes
+    """
+
+    def __init__(self, digest):
+        self.digest = digest
+        self.closed = False
+
+    def write(self, data):
+        self.digest.update(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def fingerprint(*parts) -> str:
+    """
+    Fingerprint of the inputs of a step, to skip it when they did not change.
+
+    Tables and record batches are hashed from their Arrow IPC stream (schema
+    and values), the other parts from their JSON (keys sorted).
+
+    Args:
+        parts: tables, record batches or JSON serializable values
+
+    Returns:
+        str: hex digest of the parts
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    for part in parts:
+        # Type of the module checked first: pyarrow is not imported for JSON parts
+        is_arrow = type(part).__module__.startswith("pyarrow")
+        if is_arrow and isinstance(part, (pa.Table, pa.RecordBatch)):
+            sink = pa.PythonFile(_DigestSink(digest), mode="w")
+            with pa.ipc.new_stream(sink, part.schema) as writer:
+                writer.write(part)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+
+    return digest.hexdigest()
+
+
 @task(
     name="get_data_schema",
     description="Get data schema from YAML file",
@@ -226,6 +823,8 @@ def get_data_schema(file_path: str, table_name: str) -> dict:
     """
     Get data schema from YAML file
 
+    The YAML file is parsed once and cached, see `core.libs.schema_registry`.
+
     Args:
         file_path: Path to the YAML file
         table_name: Name of the table to get the schema for
@@ -236,17 +835,132 @@ def get_data_schema(file_path: str, table_name: str) -> dict:
     # Get logger
     logger = get_run_logger()
 
-    # Load the YAML file
+    # Find the table in the schema registry
+    data_schema = get_schema(table_name, file_path)
+
+    if not data_schema:
+        logger.error(f"Table {table_name} not found in {file_path}")
+
+    return data_schema
+
+
+def get_sources(file_path: str = PATH_CONFIG_SOURCES) -> list:
+    """
+    Get the sources of the ingestion from YAML file
+
+    Args:
+        file_path: Path to the YAML file
+
+    Returns:
+        list: source specs (name, path, schema, max_records)
+    """
     with open(file_path, "r") as file:
         config = yaml.safe_load(file)
 
-    # Find the table in the YAML file
-    for table in config["datamodel"]["tables"]:
-        if table["name"] == table_name:
-            return table
+    return [
+        {"schema": "raw", **source} for source in (config or {}).get("sources") or []
+    ]
+
+
+def cast_iso_values(values, iso_type, target_type):
+    """
+    Cast strings to timestamps of `iso_type`, then to the target type.
+
+    The strings are cast at once. When one of them is not a valid date (e.g.
+    month 13), they are cast one by one and the invalid ones become null.
+
+    Args:
+        values: strings to cast (ISO 8601 or null)
+        iso_type: timestamp type the strings are parsed as (with or without
+            timezone)
+        target_type: timestamp type
+
+    Returns:
+        column of timestamps
+    """
+    try:
+        return pc.cast(values, iso_type).cast(target_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+
+    parsed = []
+    for value in values.to_pylist():
+        try:
+            parsed.append(pc.cast(pa.array([value], pa.string()), iso_type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            parsed.append(pa.nulls(1, iso_type))
 
-    logger.error(f"Table {table_name} not found in {file_path}")
-    return {}
+    return pa.chunked_array(parsed, iso_type).cast(target_type)
+
+
+def cast_iso_datetime(column, target_type):
+    """
+    Cast the ISO 8601 strings of a column to timestamps, the other values
+    become null.
+
+    The strings with a timezone and the naive ones (UTC) are cast apart, each
+    at once.
+
+    Args:
+        column: column to cast
+        target_type: timestamp type
+
+    Returns:
+        column of timestamps
+    """
+    is_iso = pc.fill_null(pc.match_substring_regex(column, ISO_DATETIME_PATTERN), False)
+    has_zone = pc.fill_null(pc.match_substring_regex(column, ISO_ZONE_PATTERN), False)
+    is_zoned = pc.and_(is_iso, has_zone)
+    is_naive = pc.and_(is_iso, pc.invert(has_zone))
+
+    null = pa.scalar(None, column.type)
+    zoned = cast_iso_values(
+        pc.if_else(is_zoned, column, null),
+        pa.timestamp(target_type.unit, tz="UTC"),
+        target_type,
+    )
+    naive = cast_iso_values(
+        pc.if_else(is_naive, column, null),
+        pa.timestamp(target_type.unit),
+        target_type,
+    )
+
+    return pc.coalesce(zoned, naive)
+
+
+def cast_datetime(column, target_type):
+    """
+    Cast a column of strings to timestamps.
+
+    ISO 8601 strings with a timezone are cast at once. When some values are
+    not, the ISO 8601 values are cast apart and the others are parsed with
+    the `DATETIME_FORMATS` (naive values are UTC). The values which can't be
+    parsed become null instead of failing the whole column.
+
+    Args:
+        column: column to cast
+        target_type: timestamp type
+
+    Returns:
+        column of timestamps
+    """
+    try:
+        return pc.cast(column, target_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+
+    parsed = cast_iso_datetime(column, target_type)
+    for fmt in DATETIME_FORMATS:
+        values = pc.strptime(
+            column, format=fmt, unit=target_type.unit, error_is_null=True
+        ).cast(target_type)
+        parsed = pc.coalesce(parsed, values)
+
+    nb_errors = parsed.null_count - column.null_count
+    if nb_errors:
+        get_run_logger().warning(f"{nb_errors} values can't be parsed as datetime")
+
+    return parsed
 
 
 @task(
@@ -258,6 +972,9 @@ def update_columns_types(table: pa.Table, data_schema: dict) -> pa.Table:
     """
     Update columns types based on the schema from config YAML file.
 
+    The columns are cast in Arrow, without going through NumPy, and the
+    columns which already have the right type are kept as is (zero-copy).
+
     Args:
         table: PyArrow Table to update
         data_schema: Schema of the table to update
@@ -265,40 +982,22 @@ def update_columns_types(table: pa.Table, data_schema: dict) -> pa.Table:
     Returns:
         PyArrow Table with updated column types
     """
-    # Convert table to dict of arrays for modification
-    data_dict = {
-        col_name: table[col_name].to_numpy() for col_name in table.column_names
-    }
-
-    # Update types based on schema
-    for col in data_schema["columns"]:
-        col_name = col["name"]
-        col_type = col["type"]
-
-        if col_name in table.column_names:
-            # Create a new PyArrow type based on the schema
-            if col_type == "integer":
-                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.int64())
-            elif col_type == "float":
-                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.float64())
-            elif col_type == "string":
-                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.string())
-            elif col_type == "datetime":
-                # Convert to timestamp, handling potential parsing errors
-                try:
-                    data_dict[col_name] = pa.array(
-                        data_dict[col_name], type=pa.timestamp("ns")
-                    )
-                except:
-                    # For invalid datetime values, keep as string
-                    data_dict[col_name] = pa.array(
-                        data_dict[col_name], type=pa.string()
-                    )
-            elif col_type == "bool":
-                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.bool_())
-
-    # Recreate the table with updated arrays
-    return pa.Table.from_arrays(
-        [data_dict[col_name] for col_name in table.column_names],
-        names=table.column_names,
-    )
+    for field in get_arrow_schema(data_schema):
+        if field.name not in table.column_names:
+            continue
+
+        index = table.schema.get_field_index(field.name)
+        column = table.column(index)
+
+        # Already the right type -> nothing to do
+        if column.type == field.type:
+            continue
+
+        if pa.types.is_timestamp(field.type) and pa.types.is_string(column.type):
+            column = cast_datetime(column, field.type)
+        else:
+            column = pc.cast(column, field.type)
+
+        table = table.set_column(index, field.name, column)
+
+    return table
@@ -1,5 +1,7 @@
-import pyarrow as pa
-import pyarrow.compute as pc
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
 
 # Prefect
 from prefect import task
@@ -7,14 +9,32 @@ from prefect import task
 # Paths
 from core.config.path import URL_API, PATH_DATA_RAW, PATH_CONFIG_SCHEMA
 
+# Settings
+from core.config.settings import API_MAX_RECORDS, API_WATERMARK_FIELD
+
 # Utils
 from core.libs.utils import (
     get_data_api,
+    load_data,
     upd_data_artifact,
-    get_data_schema,
-    save_data,
+    save_dataset,
+    compact_dataset,
     update_columns_types,
+    write_dataset_batches,
+    fingerprint,
 )
+from core.libs.state_utils import read_state, write_state
+from core.libs.api_utils import iter_pages, iter_updated_pages, Watermark
+from core.libs.schema_registry import get_schema, get_column_paths, get_arrow_schema
+
+# Lazy imports: pyarrow is imported at its first use
+from core.libs.lazy_utils import lazy_import
+
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+
+# Empty dict used to resolve missing nested values
+_EMPTY = {}
 
 
 def get_nested_value(item, path, default=None):
@@ -45,6 +65,46 @@ def get_nested_value(item, path, default=None):
         return default
 
 
+def _get_level(values, key):
+    """
+    Get the value of a key for each dict of a list, None if missing or not a dict
+    """
+    try:
+        return [(value or _EMPTY).get(key) for value in values]
+    except AttributeError:
+        # Some values are not dicts -> check each value
+        return [value.get(key) if isinstance(value, dict) else None for value in values]
+
+
+def extract_columns(json_data, column_paths):
+    """
+    Extract the columns from the records, one list per output column.
+
+    Each level of a path is resolved for all the records at once, and the
+    levels shared by several columns (e.g. `pad` for `pad.name` and
+    `pad.country.name`) are resolved only once.
+
+    Args:
+        json_data (list): records to extract the columns from
+        column_paths (tuple): compiled paths, see `get_column_paths`
+
+    Returns:
+        dict: values of each column
+    """
+    levels = {(): json_data}
+    columns = {}
+
+    for name, keys in column_paths:
+        for depth in range(1, len(keys) + 1):
+            prefix = keys[:depth]
+            if prefix not in levels:
+                levels[prefix] = _get_level(levels[prefix[:-1]], prefix[-1])
+
+        columns[name] = levels[keys]
+
+    return columns
+
+
 @task(
     name="filter_columns",
     task_run_name="filter-columns",
@@ -59,22 +119,384 @@ def filter_columns(json_data, data_schema):
         columns (list): List of columns to keep
     """
 
-    # Create a dictionary to map link
-    corresp_dict = {col["name"]: col["link"] for col in data_schema["columns"]}
+    # Compiled links of the columns
+    column_paths = get_column_paths(data_schema)
+
+    # Extract the necessary fields, one list per column
+    columns = extract_columns(json_data, column_paths)
+
+    # Convert the columns to a PyArrow Table
+    return pa.Table.from_pydict(columns)
+
 
-    data = []
+def get_struct_path(table, keys):
+    """
+    Get a nested field of a table of struct columns by following a tuple of keys.
+
+    Args:
+        table (pa.Table): Table with nested (struct) columns
+        keys (tuple): Path to the field
 
-    # Loop through the JSON data and extract the necessary fields
-    for item in json_data:
-        filtered_item = {}
-        for new_name, old_name in corresp_dict.items():
-            # Extract the value from the nested structure
-            filtered_item[new_name] = get_nested_value(item, old_name)
+    Returns:
+        The values of the field, null values if the path does not exist
+    """
+    if keys[0] not in table.column_names:
+        return pa.nulls(table.num_rows)
 
-        data.append(filtered_item)
+    column = table[keys[0]]
 
-    # Convert the list of dictionaries to a PyArrow Table
-    return pa.Table.from_pylist(data)
+    for key in keys[1:]:
+        if not pa.types.is_struct(column.type) or column.type.get_field_index(key) < 0:
+            return pa.nulls(table.num_rows)
+
+        column = pc.struct_field(column, key)
+
+    return column
+
+
+@task(
+    name="project_columns",
+    task_run_name="project-columns",
+    description="Project columns from nested data",
+)
+def project_columns(table, data_schema):
+    """
+    Get necessary columns from a table of nested records (Arrow engine)
+
+    The links of the schema are resolved with struct field access,
+    the projection runs in Arrow without looping over the rows in Python.
+
+    Args:
+        table (pa.Table): Table with nested (struct) columns
+        data_schema (dict): Schema of the table
+    """
+    column_paths = get_column_paths(data_schema)
+
+    return pa.table({name: get_struct_path(table, keys) for name, keys in column_paths})
+
+
+def records_to_table(json_data):
+    """
+    Convert records to a table of nested (struct) columns.
+
+    The type of the nested fields is inferred on all the records,
+    not only on the first one.
+
+    Args:
+        json_data (list): records
+
+    Returns:
+        pa.Table: Table with one column per top-level key
+    """
+    if not json_data:
+        return pa.table({})
+
+    return pa.Table.from_struct_array(pa.array(json_data))
+
+
+def select_columns(json_data, data_schema, engine="python"):
+    """
+    Get necessary columns from the records with the chosen engine
+
+    - python: compiled columnar extractor (`filter_columns`)
+    - arrow: struct field access in Arrow (`project_columns`)
+
+    Args:
+        json_data (list): records
+        data_schema (dict): Schema of the table
+        engine (str): python or arrow
+    """
+    if engine == "arrow":
+        return project_columns.fn(records_to_table(json_data), data_schema)
+
+    return filter_columns.fn(json_data, data_schema)
+
+
+def add_ingestion_columns(table, ingested_at, source=None):
+    """
+    Add the ingestion time (ingested_at), date (ingestion_date) and
+    source (if given) to a table
+
+    Args:
+        table (pa.Table): Table of the ingested data
+        ingested_at (datetime): time of the ingestion (UTC)
+        source (str): name of the source of the data
+
+    Returns:
+        pa.Table: Table with the ingestion columns
+    """
+    table = table.append_column(
+        "ingested_at",
+        pa.array([ingested_at] * table.num_rows, type=pa.timestamp("ns", tz="UTC")),
+    )
+    table = table.append_column(
+        "ingestion_date",
+        pa.array([ingested_at.date().isoformat()] * table.num_rows, type=pa.string()),
+    )
+
+    if source is None:
+        return table
+
+    return table.append_column(
+        "source", pa.array([source] * table.num_rows, type=pa.string())
+    )
+
+
+def conform_table(table, arrow_schema):
+    """
+    Conform a table to a schema: columns in the order of the schema,
+    missing columns filled with nulls, extra columns dropped
+
+    Args:
+        table (pa.Table): Table to conform (already cast)
+        arrow_schema (pa.Schema): target schema
+
+    Returns:
+        pa.Table: Table with the schema
+    """
+    return pa.table(
+        [
+            (
+                table[field.name]
+                if field.name in table.column_names
+                else pa.nulls(table.num_rows, type=field.type)
+            )
+            for field in arrow_schema
+        ],
+        schema=arrow_schema,
+    )
+
+
+def iter_record_batches(
+    pages,
+    data_schema,
+    engine="python",
+    ingested_at=None,
+    source=None,
+    dataset_schema=None,
+):
+    """
+    Project and cast each page of records into a PyArrow RecordBatch
+
+    Args:
+        pages: iterable of pages (list of records of an API, or record batches
+            of a file)
+        data_schema: Schema used to project the records (links)
+        engine: engine of the projection (python or arrow)
+        ingested_at: time of the ingestion, added to the batches if given
+        source: name of the source, added to the batches if given
+        dataset_schema: Schema of the output batches (default: data_schema)
+
+    Yields:
+        pa.RecordBatch: typed batch of each page
+    """
+    dataset_schema = dataset_schema or data_schema
+
+    for records in pages:
+        if not records:
+            continue
+
+        # Record batches of a file -> struct field access in Arrow
+        if isinstance(records, pa.RecordBatch):
+            table = project_columns.fn(pa.Table.from_batches([records]), data_schema)
+        else:
+            table = select_columns(records, data_schema, engine)
+
+        if ingested_at is not None:
+            table = add_ingestion_columns(table, ingested_at, source)
+
+        table = update_columns_types.fn(table, dataset_schema)
+        table = conform_table(table, get_arrow_schema(dataset_schema))
+
+        yield from table.to_batches()
+
+
+def is_url(path):
+    """
+    Check if the path of a source is an URL (API) or a file path
+    """
+    return urlsplit(path).scheme in ("http", "https")
+
+
+def ingest_source(
+    source: dict,
+    ingested_at: datetime,
+    max_records: int = API_MAX_RECORDS,
+    stream: bool = False,
+    engine: str = "python",
+):
+    """
+    Ingest one source into the raw dataset
+
+    - API (URL): get the records updated since the last run (watermark on
+      the `watermark` field of the source, default `last_updated`), up to
+      `max_records`
+    - File: load it with `load_data` (CSV, Parquet, JSON, JSON Lines)
+    - Project the columns with the schema of the source
+    - Add the ingestion columns, cast and conform to the raw schema
+    - Append the data to the raw dataset, without compaction
+
+    The fingerprint of the payload (and of the schemas) is saved after each
+    ingestion: when the source returns the same payload on the next run,
+    nothing is projected, cast or written. The stream mode always writes
+    (changed when at least one row was written).
+
+    Args:
+        source: source spec (name, path, schema, max_records, watermark, stream)
+        ingested_at: time of the ingestion (UTC)
+        max_records: max number of records fetched from an API (None for all)
+        stream: process the data page by page (API) or batch by batch (file)
+        engine: engine of the projection of the API records (python or arrow)
+
+    Returns:
+        dict: name of the source, number of rows, partitions written,
+            changed (False when the payload did not change)
+    """
+    file_src = source["path"]
+    file_dest = f"{PATH_DATA_RAW}/rockets_launches"
+    partition_cols = ["ingestion_date"]
+    max_records = source.get("max_records", max_records)
+    stream = source.get("stream", stream)
+
+    # Schema of the source (links) and of the raw dataset
+    source_schema = get_schema(source.get("schema", "raw"), PATH_CONFIG_SCHEMA)
+    dataset_schema = get_schema("raw", PATH_CONFIG_SCHEMA)
+    if not source_schema:
+        raise ValueError(f"Schema {source.get('schema')} not found for {source}")
+
+    partitions = [{"ingestion_date": ingested_at.date().isoformat()}]
+
+    # Incremental extraction of an API -> records updated since the last run
+    watermark = None
+    watermark_field = source.get("watermark", API_WATERMARK_FIELD)
+    watermark_state = f"watermark_{source['name']}"
+    if is_url(file_src) and watermark_field:
+        watermark = Watermark(
+            watermark_field, read_state(watermark_state), max_records=max_records
+        )
+
+    # Streaming mode -> each page of the API (or batch of the file) goes
+    # straight to the dataset
+    if stream:
+        if not is_url(file_src):
+            pages = load_data.fn(file_src, stream=True)
+        elif watermark is not None:
+            pages = iter_updated_pages(file_src, watermark, max_records=max_records)
+        else:
+            pages = iter_pages(file_src, max_records=max_records)
+        nb_rows = write_dataset_batches(
+            iter_record_batches(
+                pages,
+                source_schema,
+                engine,
+                ingested_at,
+                source["name"],
+                dataset_schema,
+            ),
+            file_dest,
+            schema=get_arrow_schema(dataset_schema),
+            partition_cols=partition_cols,
+        )
+
+        if watermark is not None:
+            write_state(watermark_state, watermark.next_state())
+
+        return {
+            "source": source["name"],
+            "rows": nb_rows,
+            "partitions": partitions,
+            "changed": nb_rows > 0,
+        }
+
+    # Load data -> records of an API, table of a file
+    if is_url(file_src):
+        payload = get_data_api.fn(
+            file_src, paginate=True, max_records=max_records, watermark=watermark
+        )
+    else:
+        payload = load_data.fn(file_src)
+
+    # No new records, or same payload and schemas as the last ingestion -> skip
+    payload_fingerprint = fingerprint(payload, source_schema, dataset_schema)
+    state_name = f"fingerprint_{source['name']}"
+    if len(payload) == 0 or read_state(state_name) == payload_fingerprint:
+        return {"source": source["name"], "rows": 0, "partitions": [], "changed": False}
+
+    # Collect necessary columns
+    if is_url(file_src):
+        table = select_columns(payload, source_schema, engine)
+    else:
+        table = project_columns.fn(payload, source_schema)
+
+    # Add ingestion columns
+    table = add_ingestion_columns(table, ingested_at, source["name"])
+
+    # Update columns types, columns of the raw dataset
+    table = update_columns_types.fn(table, dataset_schema)
+    table = conform_table(table, get_arrow_schema(dataset_schema))
+
+    # Save data
+    save_dataset.fn(
+        table=table,
+        base_dir=file_dest,
+        partition_cols=partition_cols,
+        compact=False,
+    )
+
+    # Saved -> the next run with the same payload is skipped, the next
+    # extraction starts from the newest update
+    write_state(state_name, payload_fingerprint)
+    if watermark is not None:
+        write_state(watermark_state, watermark.next_state())
+
+    return {
+        "source": source["name"],
+        "rows": table.num_rows,
+        "partitions": partitions,
+        "changed": True,
+    }
+
+
+@task(
+    name="task_ingest_source",
+    task_run_name="task-ingest-source-{source[name]}",
+    description="Ingest one source into the raw dataset",
+)
+def task_ingest_source(
+    source: dict,
+    ingested_at: datetime,
+    max_records: int = API_MAX_RECORDS,
+    stream: bool = False,
+    engine: str = "python",
+):
+    """
+    Task to ingest one source (see `ingest_source`), mapped over the sources
+    by the flow. The partitions are compacted once all the sources are written.
+
+    Args:
+        source: source spec (name, path, schema, max_records, watermark, stream)
+        ingested_at: time of the ingestion (UTC), shared by all the sources
+        max_records: max number of records fetched from an API (None for all)
+        stream: process the data page by page (API) or batch by batch (file)
+        engine: engine of the projection of the API records (python or arrow)
+
+    Returns:
+        dict: name of the source, number of rows, partitions written,
+            changed (False when the payload did not change)
+    """
+    result = ingest_source(source, ingested_at, max_records, stream, engine)
+
+    # Update artifact
+    upd_data_artifact(
+        info=f"Ingestion data from {source['name']} ({source['path']})",
+        data=(
+            f"{result['rows']} rows"
+            if result["changed"]
+            else "No new data since the last run, skipped"
+        ),
+    )
+
+    return result
 
 
 @task(
@@ -82,39 +504,57 @@ def filter_columns(json_data, data_schema):
     task_run_name="task-ingestion",
     description="Ingest data from API",
 )
-def task_ingestion():
+def task_ingestion(
+    url: str = URL_API,
+    max_records: int = API_MAX_RECORDS,
+    stream: bool = False,
+    engine: str = "python",
+):
     """
     Task to ingest data from API
 
-    - Get data from API
+    - Get data from API (all the pages, up to `max_records`)
     - Retrieve necessary columns
     - Update columns types
-    - Save data to parquet file
-    """
+    - Append data to the partitioned parquet dataset (by ingestion date)
 
-    file_src = f"{URL_API}"
-    file_dest = f"{PATH_DATA_RAW}/rockets_launches.parquet"
+    Args:
+        url: URL of the API (first page)
+        max_records: max number of records to fetch (None for all)
+        stream: process the data page by page, the memory is bounded by one page
+        engine: engine of the projection, python (row records) or arrow (structs)
 
-    # Get schema of data
-    data_schema = get_data_schema(file_path=PATH_CONFIG_SCHEMA, table_name="raw")
+    Returns:
+        dict: number of rows, changed (False when the payload did not change)
+    """
 
-    # Load data -> returns a JSON file
-    json_data = get_data_api(file_src)
+    file_src = f"{url}"
+    file_dest = f"{PATH_DATA_RAW}/rockets_launches"
+    ingested_at = datetime.now(timezone.utc)
 
-    # Collect necessary columns
-    table = filter_columns(json_data, data_schema)
+    # Ingest the API as a single source
+    result = ingest_source(
+        {"name": "launches_api", "path": file_src, "schema": "raw"},
+        ingested_at,
+        max_records=max_records,
+        stream=stream,
+        engine=engine,
+    )
 
-    # Update columns types
-    table = update_columns_types(table, data_schema)
+    # Compact the partitions written
+    compact_dataset.fn(file_dest, result["partitions"])
 
-    # Save data
-    save_data(
-        table=table,
-        file_path=file_dest,
-    )
+    # Get schema of data
+    data_schema = get_schema("raw", PATH_CONFIG_SCHEMA)
 
     # Update artifact
     upd_data_artifact(
-        info=f"Ingestion data from {file_src}",
-        data=f"{table.num_rows} rows and {len(table.column_names)} columns",
+        info=f"Ingestion data from {file_src}" + (" (stream)" if stream else ""),
+        data=(
+            f"{result['rows']} rows and {len(data_schema['columns'])} columns"
+            if result["changed"]
+            else "No new data since the last run, skipped"
+        ),
     )
+
+    return {"rows": result["rows"], "changed": result["changed"]}
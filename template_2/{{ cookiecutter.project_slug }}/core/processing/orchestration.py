@@ -1,27 +1,83 @@
+from datetime import datetime, timezone
+
 # Prefect
-from prefect import flow
+from prefect import flow, unmapped
 from prefect.logging import get_run_logger
+from prefect.task_runners import ThreadPoolTaskRunner
+
+# Paths
+from core.config.path import PATH_DATA_RAW
 
+# Settings
+from core.config.settings import FLOW_TASK_RUNNER, FLOW_MAX_WORKERS
 
 # Utils
 from core.libs.utils import (
     save_artifact,
+    get_sources,
+    compact_dataset,
 )
+from core.libs.api_utils import reset_http_session
 
 # Tasks
-from core.processing.ingestion import task_ingestion
+from core.processing.ingestion import task_ingest_source
 from core.processing.transform import task_transform
 
 
+def get_task_runner(kind: str = FLOW_TASK_RUNNER, max_workers: int = FLOW_MAX_WORKERS):
+    """
+    Get the task runner of the flow
+
+    - thread: the tasks run in threads, for I/O bound tasks (API, files, database)
+    - process: the tasks run in worker processes, for CPU bound tasks
+
+    Args:
+        kind: thread or process
+        max_workers: number of tasks running at the same time
+
+    Returns:
+        TaskRunner: task runner of the flow
+    """
+    if kind == "thread":
+        return ThreadPoolTaskRunner(max_workers=max_workers)
+
+    if kind == "process":
+        # Not available in the first Prefect 3 releases
+        from prefect.task_runners import ProcessPoolTaskRunner
+
+        return ProcessPoolTaskRunner(max_workers=max_workers)
+
+    raise ValueError(f"Unknown task runner: {kind} (thread or process)")
+
+
+def reset_clients():
+    """
+    Close the clients shared by the runs of the process: HTTP session
+    (long-lived mode, see serve.py)
+
+    The next run opens new ones.
+    """
+    reset_http_session()
+
+
 @flow(
     name="flow_rockets_launch",
     flow_run_name="flow-rockets-launch",
     log_prints=True,
+    task_runner=get_task_runner(),
     description="Flow to orchestrate the ingestion, transformation, and loading of data",
 )
-def flow_rockets_launch():
+def flow_rockets_launch(sources: list | None = None):
     """
     Flow to orchestrate the ingestion, transformation, and loading of data
+
+    The sources are ingested concurrently (one task per source) into the
+    raw dataset, then the partitions written are compacted once. When no
+    source changed since the last run, the compaction and the transformation
+    are skipped.
+
+    Args:
+        sources: source specs to ingest (default: core/config/sources.yaml)
     """
 
     # Get logger
@@ -31,14 +87,41 @@ def flow_rockets_launch():
     logger.info("FLOW ROCKETS LAUNCH STARTED")
     logger.info("-" * 50)
 
-    # Run the ingestion flow
-    task_ingestion()
+    try:
+        # Run the ingestion flow, one task per source
+        ingestions = task_ingest_source.map(
+            sources or get_sources(),
+            ingested_at=unmapped(datetime.now(timezone.utc)),
+        )
+
+        # Wait for the sources, raise the error of a failed source
+        results = ingestions.result()
+
+        # Same payloads as the last run -> nothing to compact or transform
+        if any(result["changed"] for result in results):
+            # Compact the partitions written by the sources
+            partitions = {
+                tuple(partition.items())
+                for result in results
+                for partition in result["partitions"]
+            }
+            compaction = compact_dataset.submit(
+                f"{PATH_DATA_RAW}/rockets_launches",
+                [dict(partition) for partition in sorted(partitions)],
+            )
 
-    # Run the transformation flow
-    task_transform()
+            # Run the transformation flow (only the new launches), once the
+            # new launches are saved
+            transform = task_transform.submit(incremental=True, wait_for=[compaction])
 
-    # Save the artifact
-    save_artifact(key_name="flow-rockets-launch-artifact")
+            # Wait for the tasks, raise the error of a failed task
+            for future in [compaction, transform]:
+                future.result()
+        else:
+            logger.info("No new data since the last run, transformation skipped")
+    finally:
+        # Save the artifact (also the entries of a failed run)
+        save_artifact(key_name="flow-rockets-launch-artifact")
 
     logger.info("-" * 50)
     logger.info("FLOW ROCKETS LAUNCH COMPLETED")
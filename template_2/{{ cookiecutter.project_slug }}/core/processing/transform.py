@@ -1,22 +1,71 @@
-import pyarrow as pa
-import pyarrow.compute as pc
-import pyarrow.parquet as pq
+from __future__ import annotations
+
+from pathlib import Path
 
 # Prefect
 from prefect import task
 
 # Paths
-from core.config.path import PATH_DATA_RAW, PATH_DATA_PROCESSED, PATH_CONFIG_SCHEMA
+from core.config.path import (
+    PATH_DATA_RAW,
+    PATH_DATA_PROCESSED,
+    PATH_DATA_STATE,
+    PATH_CONFIG_SCHEMA,
+)
+
+# Settings
+from core.config.settings import STATE_LEDGER_PARTITIONS
 
 # Utils
 from core.libs.utils import (
     load_data,
     save_data,
-    get_data_schema,
     upd_data_artifact,
     update_columns_types,
+    drop_duplicates,
+)
+from core.libs.schema_registry import get_schema, build_arrow_schema
+from core.libs.state_utils import (
+    read_state,
+    write_state,
+    read_state_table,
+    write_state_table,
+    state_partition,
+    state_partition_name,
+    read_state_partitions,
+    write_state_partitions,
+    remove_state_tables,
 )
 
+# Lazy imports: pyarrow is imported at its first use
+from core.libs.lazy_utils import lazy_import
+
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+ds = lazy_import("pyarrow.dataset")
+
+# Columns of the raw dataset needed for the launch stats
+LAUNCH_COLUMNS = ["id", "country", "status", "ingested_at"]
+
+# Schemas of the incremental state of the launch stats (columns types of
+# the config YAML file, PyArrow schemas built at the first use)
+STATS_SCHEMA = {
+    "name": "launch_stats",
+    "columns": [
+        {"name": "country", "type": "string"},
+        {"name": "nb_launch", "type": "integer"},
+        {"name": "nb_success", "type": "integer"},
+    ],
+}
+LEDGER_SCHEMA = {
+    "name": "launch_stats_ledger",
+    "columns": [
+        {"name": "id", "type": "string"},
+        {"name": "country", "type": "string"},
+        {"name": "is_success", "type": "integer"},
+    ],
+}
+
 
 @task(
     name="nb_launches_by_country",
@@ -28,50 +77,348 @@ def nb_launches_by_country(table: pa.Table) -> pa.Table:
     Get number of launches by country
     Get number of successful launches by country
 
+    Single pass hash group-by on the country, the successful launches are
+    counted by summing a boolean column (status == success, case-insensitive).
+
     Returns:
         pa.Table: Table with columns (country, nb_launch, nb_success)
     """
-    # Extract unique countries
-    countries = pc.unique(table["country"])
+    # No launches -> empty table with the right schema
+    if table.num_rows == 0:
+        return pa.table(
+            {
+                "country": pa.array([], type=pa.string()),
+                "nb_launch": pa.array([], type=pa.int64()),
+                "nb_success": pa.array([], type=pa.int64()),
+            }
+        )
 
-    # Create a list to store the results
-    results = []
+    # Flag successful launches, case-insensitive comparison
+    status = table["status"].cast(pa.string())
+    is_success = pc.equal(pc.utf8_lower(status), "success")
+    is_success = pc.fill_null(is_success, False).cast(pa.int64())
 
-    # For each country, count total launches and successful launches
-    for country in countries:
-        country_str = country.as_py()
+    launches = pa.table({"country": table["country"], "is_success": is_success})
 
-        # Filter data for this country
-        mask_country = pc.equal(table["country"], country)
-        country_data = table.filter(mask_country)
+    # Count total launches and successful launches for each country
+    stats = launches.group_by("country").aggregate(
+        [
+            ([], "count_all"),
+            ("is_success", "sum"),
+        ]
+    )
 
-        # Count total launches for this country
-        nb_launch = country_data.num_rows
+    return pa.table(
+        {
+            "country": stats["country"],
+            "nb_launch": stats["count_all"],
+            "nb_success": stats["is_success_sum"],
+        }
+    )
 
-        # Count successful launches for this country
-        # Convert status to lowercase for case-insensitive comparison
-        status_lower = pc.utf8_lower(country_data["status"])
-        success_mask = pc.equal(status_lower, "success")
-        success_data = country_data.filter(success_mask)
-        nb_success = success_data.num_rows if success_data else 0
 
-        # Add to results
-        results.append(
-            {"country": country_str, "nb_launch": nb_launch, "nb_success": nb_success}
-        )
+def launch_contributions(table: pa.Table) -> pa.Table:
+    """
+    Get the contribution of each launch to the stats, one row per launch id
+    (the last row of an id wins)
 
-    # Convert the results to a PyArrow Table
-    if results:
-        return pa.Table.from_pylist(results)
-    else:
-        # Create an empty table with the right schema
-        return pa.table(
-            {
-                "country": pa.array([], type=pa.string()),
-                "nb_launch": pa.array([], type=pa.int64()),
-                "nb_success": pa.array([], type=pa.int64()),
-            }
+    Returns:
+        pa.Table: Table with columns (id, country, is_success)
+    """
+    is_success = pc.equal(pc.utf8_lower(table["status"].cast(pa.string())), "success")
+
+    contributions = pa.table(
+        {
+            "id": table["id"].cast(pa.string()),
+            "country": table["country"].cast(pa.string()),
+            "is_success": pc.fill_null(is_success, False).cast(pa.int64()),
+        }
+    )
+
+    return drop_duplicates(contributions, ["id"])
+
+
+def fold_launch_stats(stats: pa.Table, ledger: pa.Table, launches: pa.Table):
+    """
+    Fold new launches into the running totals of launches by country.
+
+    The ledger keeps the contribution (country, is_success) already counted
+    for each launch id, so a launch seen again is not counted twice, and a
+    corrected launch (new country or status) has its previous contribution
+    subtracted before the new one is added.
+
+    Args:
+        stats: running totals (country, nb_launch, nb_success)
+        ledger: contributions already counted (id, country, is_success)
+        launches: launches to fold (id, country, status)
+
+    Returns:
+        tuple: updated (stats, ledger)
+    """
+    new = launch_contributions(launches)
+
+    # Previous contribution of each launch (null if never counted)
+    previous = ledger.rename_columns(["id", "old_country", "old_is_success"])
+    joined = new.join(previous, keys="id", join_type="left outer")
+
+    is_new = pc.is_null(joined["old_is_success"])
+    same_country = pc.fill_null(
+        pc.or_kleene(
+            pc.equal(joined["country"], joined["old_country"]),
+            pc.and_(pc.is_null(joined["country"]), pc.is_null(joined["old_country"])),
+        ),
+        False,
+    )
+    same_success = pc.equal(joined["is_success"], joined["old_is_success"])
+    is_changed = pc.and_(
+        pc.invert(is_new),
+        pc.invert(pc.and_(same_country, pc.fill_null(same_success, False))),
+    )
+
+    # Add new contributions, subtract the previous contribution of corrections
+    added = joined.filter(pc.or_(is_new, is_changed))
+    removed = joined.filter(is_changed)
+
+    deltas = pa.concat_tables(
+        [
+            stats,
+            pa.table(
+                {
+                    "country": added["country"],
+                    "nb_launch": pa.repeat(1, added.num_rows).cast(pa.int64()),
+                    "nb_success": added["is_success"],
+                }
+            ),
+            pa.table(
+                {
+                    "country": removed["old_country"],
+                    "nb_launch": pa.repeat(-1, removed.num_rows).cast(pa.int64()),
+                    "nb_success": pc.negate(removed["old_is_success"]),
+                }
+            ),
+        ]
+    )
+
+    totals = deltas.group_by("country").aggregate(
+        [("nb_launch", "sum"), ("nb_success", "sum")]
+    )
+    stats = pa.table(
+        {
+            "country": totals["country"],
+            "nb_launch": totals["nb_launch_sum"],
+            "nb_success": totals["nb_success_sum"],
+        }
+    ).filter(pc.greater(totals["nb_launch_sum"], 0))
+
+    # Ledger: replace the contributions of the folded launches
+    ledger = pa.concat_tables(
+        [ledger.filter(pc.invert(pc.is_in(ledger["id"], new["id"]))), new]
+    )
+
+    return stats, ledger
+
+
+def stats_state_name(version: int) -> str:
+    """
+    Get the name of a version of the running totals of the launch stats
+
+    Args:
+        version: version of the launch stats state
+
+    Returns:
+        str: name of the table state of the totals
+    """
+    return f"launch_stats/{version:06d}"
+
+
+def read_launch_stats_state() -> dict:
+    """
+    Read the committed version of the launch stats state
+
+    The state of a previous version (totals, ledger and watermark in separate
+    files, written one after the other) is committed as the first version.
+
+    Returns:
+        dict: version, watermark and version of each partition of the ledger
+            (by partition, as string)
+    """
+    state = read_state("launch_stats_state", default=None)
+    if state is not None:
+        return state
+
+    state = {"version": 0, "watermark": None, "ledger": {}}
+
+    stats_path = Path(PATH_DATA_STATE) / "launch_stats.parquet"
+    if not stats_path.exists():
+        return state
+
+    # Ledger of a previous version: one file, or one file per partition
+    ledger_names = ["launch_stats_ledger"] + [
+        f"launch_stats_ledger/{path.stem}"
+        for path in sorted(
+            (Path(PATH_DATA_STATE) / "launch_stats_ledger").glob(
+                "[0-9][0-9][0-9][0-9].parquet"
+            )
         )
+    ]
+    ledger_schema = build_arrow_schema(LEDGER_SCHEMA)
+    ledger = pa.concat_tables(
+        [read_state_table(name, ledger_schema) for name in ledger_names]
+    )
+
+    state = commit_launch_stats_state(
+        state,
+        stats=read_state_table("launch_stats", build_arrow_schema(STATS_SCHEMA)),
+        ledger=ledger,
+        partitions=range(STATE_LEDGER_PARTITIONS),
+        watermark=read_state("launch_stats_watermark", default=None),
+    )
+
+    # Files of the previous version (the ledger partitions are removed by the commit)
+    for name in [
+        "launch_stats.parquet",
+        "launch_stats_watermark.json",
+        "launch_stats_ledger.parquet",
+    ]:
+        (Path(PATH_DATA_STATE) / name).unlink(missing_ok=True)
+
+    return state
+
+
+def commit_launch_stats_state(
+    state: dict, stats: pa.Table, ledger: pa.Table, partitions, watermark
+) -> dict:
+    """
+    Commit a new version of the launch stats state
+
+    - Write the totals and the partitions of the ledger as new files, the
+      files of the committed version are not touched
+    - Write the state file (version, watermark, files of the ledger), this
+      atomic write is the commit: a run failing before it leaves the
+      committed version as it was
+    - Remove the files of the previous versions (and of failed runs)
+
+    Args:
+        state: committed version of the state
+        stats: running totals (country, nb_launch, nb_success)
+        ledger: rows of the partitions of the ledger to write
+        partitions: partitions of the ledger to write
+        watermark: ingestion time of the latest launch folded
+
+    Returns:
+        dict: new committed version of the state
+    """
+    version = state["version"] + 1
+
+    write_state_table(stats_state_name(version), stats)
+    write_state_partitions(
+        "launch_stats_ledger",
+        ledger,
+        key="id",
+        nb_partitions=STATE_LEDGER_PARTITIONS,
+        partitions=partitions,
+        version=version,
+    )
+
+    state = {
+        "version": version,
+        "watermark": watermark,
+        "ledger": {
+            **state["ledger"],
+            **{str(partition): version for partition in partitions},
+        },
+    }
+    write_state("launch_stats_state", state)
+
+    # Files of the previous versions
+    remove_state_tables("launch_stats", keep={stats_state_name(version)})
+    remove_state_tables(
+        "launch_stats_ledger",
+        keep={
+            state_partition_name(
+                "launch_stats_ledger", int(partition), partition_version
+            )
+            for partition, partition_version in state["ledger"].items()
+        },
+    )
+
+    return state
+
+
+@task(
+    name="update_launch_stats",
+    task_run_name="update-launch-stats",
+    description="Fold new launches into the launch stats",
+)
+def update_launch_stats(file_src: str) -> pa.Table:
+    """
+    Update the running totals of launches by country (incremental mode)
+
+    - Load only the launches ingested after the watermark (partition pruning
+      on ingestion_date, predicate pushdown on ingested_at)
+    - Fold them into the persisted state: only the partitions of the ledger
+      (by launch id) of these launches are read and rewritten
+    - Commit the totals, the ledger and the watermark as a new version of the
+      state (see `commit_launch_stats_state`)
+
+    Args:
+        file_src: path of the raw dataset
+
+    Returns:
+        pa.Table: Table with columns (country, nb_launch, nb_success)
+    """
+    state = read_launch_stats_state()
+    stats = read_state_table(
+        stats_state_name(state["version"]), build_arrow_schema(STATS_SCHEMA)
+    )
+    watermark = state["watermark"]
+
+    if not Path(file_src).exists():
+        return stats
+
+    # Launches ingested since the watermark
+    launch_filter = None
+    if watermark is not None:
+        ingested_at = pa.scalar(watermark, type=pa.timestamp("ns", tz="UTC"))
+        launch_filter = (
+            ds.field("ingestion_date") >= ingested_at.as_py().date().isoformat()
+        ) & (ds.field("ingested_at") > ingested_at)
+
+    launches = load_data(file_src, columns=LAUNCH_COLUMNS, filter=launch_filter)
+
+    if launches.num_rows == 0:
+        return stats
+
+    # Latest version of each launch last
+    launches = launches.sort_by("ingested_at")
+
+    # Contributions already counted for these launches (their partitions)
+    partitions = {
+        state_partition(launch_id, STATE_LEDGER_PARTITIONS)
+        for launch_id in pc.unique(launches["id"].cast(pa.string())).to_pylist()
+    }
+    ledger = read_state_partitions(
+        "launch_stats_ledger",
+        build_arrow_schema(LEDGER_SCHEMA),
+        {
+            partition: state["ledger"][str(partition)]
+            for partition in partitions
+            if str(partition) in state["ledger"]
+        },
+    )
+    stats, ledger = fold_launch_stats(stats, ledger, launches)
+
+    # A failure before the commit leaves the previous version: the retry
+    # folds the same launches into the same totals
+    commit_launch_stats_state(
+        state,
+        stats,
+        ledger,
+        partitions,
+        watermark=pc.max(launches["ingested_at"]).cast(pa.int64()).as_py(),
+    )
+
+    return stats
 
 
 @task(
@@ -79,22 +426,32 @@ def nb_launches_by_country(table: pa.Table) -> pa.Table:
     task_run_name="task-transform",
     description="Transform data from data/raw",
 )
-def task_transform():
+def task_transform(incremental: bool = False):
     """
     Task to transform data from raw data
+
+    Args:
+        incremental: fold only the new launches into a persisted state,
+            instead of recomputing the stats from all the raw data
     """
 
-    file_src = f"{PATH_DATA_RAW}/rockets_launches.parquet"
+    file_src = f"{PATH_DATA_RAW}/rockets_launches"
     file_dest = f"{PATH_DATA_PROCESSED}/rockets_launches_stats.parquet"
 
     # Get schema of data
-    data_schema = get_data_schema(PATH_CONFIG_SCHEMA, "processed")
+    data_schema = get_schema("processed", PATH_CONFIG_SCHEMA)
 
-    # Load data
-    launch_table = load_data(file_src)
+    if incremental:
+        # Update launches by country with the new launches
+        table = update_launch_stats(file_src)
+    else:
+        # Load data, latest version of each launch
+        launch_table = load_data(file_src, columns=LAUNCH_COLUMNS)
+        if launch_table.num_rows > 0:
+            launch_table = drop_duplicates(launch_table.sort_by("ingested_at"), ["id"])
 
-    # Calculate launches by country
-    table = nb_launches_by_country(launch_table)
+        # Calculate launches by country
+        table = nb_launches_by_country(launch_table)
 
     # Update columns types
     table = update_columns_types(table, data_schema)
@@ -0,0 +1,144 @@
+"""
+Benchmark of `update_columns_types` on a wide table
+
+Compare the previous implementation (NumPy round trip of every column) with
+the Arrow-native cast. Each implementation runs in its own process, so the
+peak memory (max RSS) of each one is measured separately.
+
+The datetime columns mix ISO 8601 and other formats: the previous
+implementation fails to cast them and keeps the strings, the Arrow-native
+cast parses every value (`cast_datetime`).
+
+Usage:
+    python -m benchmarks.bench_columns_types [nb_rows] [nb_columns]
+"""
+
+import sys
+import time
+import resource
+import subprocess
+
+import numpy as np
+import pyarrow as pa
+
+from core.libs.utils import update_columns_types
+
+
+def update_columns_types_numpy(table, data_schema):
+    """
+    Previous implementation of `update_columns_types`: NumPy round trip
+    """
+    data_dict = {
+        col_name: table[col_name].to_numpy() for col_name in table.column_names
+    }
+
+    for col in data_schema["columns"]:
+        col_name = col["name"]
+        col_type = col["type"]
+
+        if col_name in table.column_names:
+            if col_type == "integer":
+                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.int64())
+            elif col_type == "float":
+                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.float64())
+            elif col_type == "string":
+                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.string())
+            elif col_type == "datetime":
+                try:
+                    data_dict[col_name] = pa.array(
+                        data_dict[col_name], type=pa.timestamp("ns")
+                    )
+                except:
+                    data_dict[col_name] = pa.array(
+                        data_dict[col_name], type=pa.string()
+                    )
+            elif col_type == "bool":
+                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.bool_())
+
+    return pa.Table.from_arrays(
+        [data_dict[col_name] for col_name in table.column_names],
+        names=table.column_names,
+    )
+
+
+def make_wide_table(nb_rows, nb_columns):
+    """
+    Make a wide table and its schema: mostly already typed columns
+    (strings, integers), some integers to cast to float and some datetime
+    strings to parse (ISO 8601 with a timezone, naive with fractional
+    seconds, dates)
+    """
+    rng = np.random.default_rng(42)
+    words = pa.array([f"value {i}" for i in range(1000)])
+    datetimes = pa.array(
+        [f"2025-01-{i % 28 + 1:02d}T12:{i % 60:02d}:00Z" for i in range(800)]
+        + [f"2025-02-{i % 28 + 1:02d}T08:30:{i % 60:02d}.{i}" for i in range(150)]
+        + [f"2025-03-{i % 28 + 1:02d}" for i in range(50)]
+    )
+
+    columns = {}
+    schema_columns = []
+    for i in range(nb_columns):
+        name = f"col_{i}"
+        kind = i % 4
+
+        if kind == 0:
+            indices = pa.array(rng.integers(0, 1000, nb_rows))
+            columns[name] = words.take(indices)
+            schema_columns.append({"name": name, "type": "string"})
+        elif kind == 1:
+            columns[name] = pa.array(rng.integers(0, 1_000_000, nb_rows))
+            schema_columns.append({"name": name, "type": "integer"})
+        elif kind == 2:
+            columns[name] = pa.array(rng.integers(0, 1_000_000, nb_rows))
+            schema_columns.append({"name": name, "type": "float"})
+        else:
+            indices = pa.array(rng.integers(0, 1000, nb_rows))
+            columns[name] = datetimes.take(indices)
+            schema_columns.append({"name": name, "type": "datetime"})
+
+    return pa.table(columns), {"columns": schema_columns}
+
+
+def run(impl, nb_rows, nb_columns):
+    """
+    Run one implementation and print its time and peak memory
+    """
+    table, data_schema = make_wide_table(nb_rows, nb_columns)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    func = update_columns_types.fn if impl == "arrow" else update_columns_types_numpy
+
+    start = time.perf_counter()
+    func(table, data_schema)
+    duration = time.perf_counter() - start
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{duration} {(rss_after - rss_before) / 1024}")
+
+
+if __name__ == "__main__":
+
+    if sys.argv[1:2] == ["--impl"]:
+        run(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))
+        sys.exit()
+
+    nb_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    nb_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+
+    print(f"{nb_rows} rows, {nb_columns} columns")
+
+    for impl in ["numpy", "arrow"]:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_columns_types", "--impl"]
+            + [impl, str(nb_rows), str(nb_columns)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+
+        duration, memory = float(output[0]), float(output[1])
+        print(
+            f"{impl:<6}: {duration:.3f}s -> {nb_rows / duration:,.0f} rows/s, "
+            f"peak memory +{memory:,.0f} MiB"
+        )
@@ -0,0 +1,102 @@
+"""
+Benchmark of the incremental dbt models
+
+Compare the rebuild of the models from the whole raw table (previous
+`table` materialization, `dbt run --full-refresh`) with the incremental run
+after an update of a few launches, as the raw table grows.
+
+The benchmark loads synthetic launches into `public.raw_rockets` (launch
+ids prefixed with `bench-`), they are deleted at the end and the models
+rebuilt. The database must be set up first (`setup/init_database.sh`) and
+the variables of the dbt profile set (`.env`).
+
+Usage:
+    python -m benchmarks.bench_dbt_incremental [nb_updates] [sizes...]
+"""
+
+import sys
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from prefect.logging import disable_run_logger
+
+from core.config.settings import DB_COPY_BATCH_ROWS, DBT_SOURCE_NAME
+from core.libs.db_utils import get_db_engine, upsert_batches_to_postgres
+from core.processing.transform import invoke_dbt
+from benchmarks.bench_postgres_load import make_table
+
+TABLE_NAME = "raw_rockets"
+SELECT = ["--select", f"source:{DBT_SOURCE_NAME}.{TABLE_NAME}+"]
+
+
+def upsert(table):
+    """
+    Upsert the launches into the raw table, as the ingestion does
+    """
+    return upsert_batches_to_postgres(
+        table.to_batches(max_chunksize=DB_COPY_BATCH_ROWS),
+        table_name=TABLE_NAME,
+        key="launch_id",
+        loaded_at="loaded_at",
+        partition_key="launch_date",
+    )
+
+
+def timed(args):
+    """
+    Duration of a dbt command
+    """
+    start = time.perf_counter()
+    invoke_dbt(args)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    nb_updates = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    sizes = [int(size) for size in sys.argv[2:]] or [10_000, 100_000, 1_000_000]
+
+    # Launches of the benchmark, apart from the launches of the API
+    table = make_table(max(sizes))
+    table = table.set_column(
+        table.schema.get_field_index("launch_id"),
+        "launch_id",
+        pc.binary_join_element_wise("bench-", table["launch_id"], ""),
+    )
+
+    print(f"{nb_updates} launches updated between the incremental runs")
+
+    try:
+        with disable_run_logger():
+            # Models built once (parse of the project, tables created)
+            invoke_dbt(["run", "--full-refresh", *SELECT])
+
+            loaded = 0
+            for size in sorted(sizes):
+                upsert(table.slice(loaded, size - loaded))
+                loaded = size
+
+                full = timed(["run", "--full-refresh", *SELECT])
+
+                # A few launches change status -> only their countries are aggregated
+                updates = table.slice(0, nb_updates)
+                updates = updates.set_column(
+                    updates.schema.get_field_index("status"),
+                    "status",
+                    pa.array([f"Updated {size}"] * nb_updates),
+                )
+                upsert(updates)
+                incremental = timed(["run", *SELECT])
+
+                print(
+                    f"{size:>10,} rows: full refresh {full:.3f}s, "
+                    f"incremental {incremental:.3f}s"
+                )
+
+    finally:
+        with get_db_engine().begin() as conn:
+            conn.exec_driver_sql(
+                f"DELETE FROM public.{TABLE_NAME} WHERE starts_with(launch_id, 'bench-')"
+            )
+        invoke_dbt(["run", "--full-refresh", *SELECT])
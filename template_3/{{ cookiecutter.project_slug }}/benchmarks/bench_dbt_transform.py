@@ -0,0 +1,70 @@
+"""
+Benchmark of the dbt transformation
+
+Compare the previous transformation (`dbt run` in a new process: start of
+dbt, parse of the project, all the models) with the in-process runner of
+`task_transform`: first run (parse of the project), next runs (manifest
+reused, models downstream of the loaded table), and no table loaded.
+
+The database must be set up first (`setup/init_database.sh`) and the
+variables of the dbt profile set (`.env`).
+
+Usage:
+    python -m benchmarks.bench_dbt_transform [nb_runs]
+"""
+
+import sys
+import time
+import subprocess
+
+from prefect.logging import disable_run_logger
+
+from core.config.path import PATH_DBT_PROJECT
+from core.processing.transform import task_transform
+
+
+def run_dbt_shell():
+    """
+    Previous transformation: `dbt run` in a new process
+    """
+    subprocess.run(
+        ["dbt", "run", "--project-dir", PATH_DBT_PROJECT]
+        + ["--profiles-dir", PATH_DBT_PROJECT],
+        capture_output=True,
+        check=True,
+    )
+
+
+def measure(run, nb_runs):
+    """
+    Median duration of `nb_runs` runs
+    """
+    durations = []
+    for _ in range(nb_runs):
+        start = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - start)
+
+    durations.sort()
+    return durations[len(durations) // 2]
+
+
+if __name__ == "__main__":
+
+    nb_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print(f"{nb_runs} runs")
+
+    with disable_run_logger():
+        print(f"dbt run (shell)      : {measure(run_dbt_shell, nb_runs):.3f}s")
+
+        # First run of the process: parse of the project
+        start = time.perf_counter()
+        task_transform.fn()
+        print(f"in-process, first run: {time.perf_counter() - start:.3f}s")
+
+        duration = measure(lambda: task_transform.fn(tables=["raw_rockets"]), nb_runs)
+        print(f"in-process, selected : {duration:.3f}s")
+
+        duration = measure(lambda: task_transform.fn(tables=[]), nb_runs)
+        print(f"in-process, no rows  : {duration:.3f}s")
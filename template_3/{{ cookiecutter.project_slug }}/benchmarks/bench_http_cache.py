@@ -0,0 +1,151 @@
+"""
+Benchmark of the HTTP cache of the API calls
+
+Poll a local stub of the launches API (limit/offset pages, ETag and
+Last-Modified validators, `304 Not Modified`) as the schedule does, with and
+without the HTTP cache, and count the bytes sent by the API:
+
+- cold: first poll, every page is downloaded (and cached)
+- unchanged: same records, every page is revalidated (304)
+- updated: the first records changed, only their page is downloaded
+
+The cache runs in a temporary directory (the cache of the project is not touched).
+
+Usage:
+    python -m benchmarks.bench_http_cache [nb_records] [nb_updated] [delay_ms]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from email.utils import formatdate
+from urllib.parse import urlsplit, parse_qsl
+
+from core.libs import http_cache
+from core.libs.api_utils import iter_pages
+from benchmarks.synthetic import make_launch_records
+
+
+def start_conditional_api(records, delay):
+    """
+    Start a local stub of the launches API which answers conditional requests
+
+    The ETag of a page is the hash of its body, `server.bytes_sent` counts
+    the bytes of the bodies sent.
+
+    Args:
+        records: launch records served by the API (can be updated in place)
+        delay: delay of each response, in seconds
+
+    Returns:
+        ThreadingHTTPServer: running server
+    """
+    last_modified = formatdate(usegmt=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            query = dict(parse_qsl(urlsplit(self.path).query))
+            limit = int(query.get("limit", 100))
+            offset = int(query.get("offset", 0))
+
+            body = json.dumps(
+                {
+                    "count": len(records),
+                    "next": None,
+                    "results": records[offset : offset + limit],
+                }
+            ).encode()
+            etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+            time.sleep(delay)
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+            with lock:
+                server.bytes_sent += len(body)
+
+    lock = threading.Lock()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.bytes_sent = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def poll(server, url, cache):
+    """
+    Fetch all the pages of the API once
+
+    Returns:
+        tuple: duration, bytes sent by the API, number of records
+    """
+    bytes_start = server.bytes_sent
+    start = time.perf_counter()
+
+    nb_records = sum(len(records) for records in iter_pages(url, cache=cache))
+
+    return time.perf_counter() - start, server.bytes_sent - bytes_start, nb_records
+
+
+if __name__ == "__main__":
+
+    nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    nb_updated = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    delay = (int(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+
+    records = make_launch_records(nb_records)
+    server = start_conditional_api(records, delay)
+    url = f"http://127.0.0.1:{server.server_port}/launches/?limit=100&offset=0"
+
+    print(
+        f"{nb_records} records, {nb_updated} updated, {delay * 1000:.0f} ms per request"
+    )
+
+    # Run in a temporary directory, with a new cache
+    project_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        http_cache._http_cache = http_cache.HttpCache()
+
+        for cache in [False, True]:
+            for run in ["cold", "unchanged", "updated"]:
+                if run == "updated":
+                    for record in records[:nb_updated]:
+                        record["status"] = {"name": f"Updated {cache}"}
+
+                duration, bytes_sent, nb_rows = poll(server, url, cache)
+                print(
+                    f"{'cache' if cache else 'no cache':<8} {run:<9}: "
+                    f"{duration:.3f}s, {bytes_sent / 1024:,.0f} KiB sent, "
+                    f"{nb_rows} records"
+                )
+
+        stats = http_cache.get_http_cache().stats
+        print(
+            f"cache: {stats['hits']} pages from the cache (304), "
+            f"{stats['bytes_saved'] / 1024:,.0f} KiB not downloaded, "
+            f"{http_cache.get_http_cache().size / 1024:,.0f} KiB on disk"
+        )
+
+        os.chdir(project_dir)
+
+    server.shutdown()
@@ -0,0 +1,83 @@
+"""
+Benchmark of the startup of the flow modules
+
+Each run of the flow (process work pool) starts a new interpreter and
+imports the entrypoint. The import of `main` and of the orchestration
+module is measured with `python -X importtime`, each run in a new
+interpreter, with the import time of the heavy libraries loaded by it
+(the libraries loaded lazily are not imported at startup).
+
+Usage:
+    python -m benchmarks.bench_import_time [nb_runs]
+"""
+
+import sys
+import subprocess
+
+ENTRYPOINTS = ["main", "core.processing.orchestration"]
+
+# Heavy libraries of the templates
+LIBRARIES = [
+    "prefect",
+    "pyarrow",
+    "pyarrow.dataset",
+    "pandas",
+    "requests",
+    "sqlalchemy",
+    "dbt.cli.main",
+]
+
+
+def import_times(module):
+    """
+    Import a module in a new interpreter, with `-X importtime`
+
+    Args:
+        module: name of the module
+
+    Returns:
+        dict: cumulative import time (us) of each module imported
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def median(values):
+    """
+    Median of a list of values
+    """
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+if __name__ == "__main__":
+
+    nb_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    print(f"{nb_runs} runs")
+
+    for module in ENTRYPOINTS:
+        runs = [import_times(module) for _ in range(nb_runs)]
+
+        print(f"import {module}: {median([run[module] for run in runs]) / 1000:.0f} ms")
+        for library in LIBRARIES:
+            if library in runs[0]:
+                duration = median([run.get(library, 0) for run in runs]) / 1000
+                print(f"  {library:<16}: {duration:6.0f} ms")
+            else:
+                print(f"  {library:<16}:    not imported")
@@ -0,0 +1,125 @@
+"""
+Benchmark of the load of the launches into PostgreSQL
+
+Compare `DataFrame.to_sql` (previous loader) with the Arrow COPY append
+(`save_to_postgres`) and the COPY + staging table upsert, then load the
+same rows again with the upsert to check that the load is idempotent
+(same number of rows, nothing rewritten).
+
+The benchmark runs on copies of `public.raw_rockets` (dropped at the end),
+the database must be set up first (`setup/init_database.sh`).
+
+Usage:
+    python -m benchmarks.bench_postgres_load [nb_records]
+"""
+
+import sys
+import time
+
+from core.config.path import PATH_CONFIG_SCHEMA
+from core.config.settings import DB_COPY_BATCH_ROWS
+from core.libs.db_utils import (
+    get_db_engine,
+    save_to_postgres,
+    upsert_batches_to_postgres,
+)
+from core.libs.schema_registry import get_schema
+from core.libs.utils import update_columns_types
+from core.processing.ingestion import filter_columns
+from benchmarks.synthetic import make_launch_records
+
+TABLES = ["bench_to_sql", "bench_copy", "bench_upsert"]
+
+
+def save_to_postgres_pandas(table, table_name, schema):
+    """
+    Previous implementation of `save_to_postgres`: pandas conversion + to_sql
+    """
+    table.to_pandas().to_sql(
+        name=table_name,
+        con=get_db_engine(),
+        schema=schema,
+        if_exists="append",
+        index=False,
+    )
+
+
+def make_table(nb_records):
+    """
+    Make a typed table of launches, as produced by the ingestion
+    """
+    data_schema = get_schema("raw_rockets", PATH_CONFIG_SCHEMA)
+    records = make_launch_records(nb_records)
+
+    table = filter_columns.fn(records, data_schema)
+    return update_columns_types.fn(table, data_schema)
+
+
+def count_rows(engine, table_name):
+    """
+    Count the rows of a benchmark table
+    """
+    with engine.connect() as conn:
+        return conn.exec_driver_sql(
+            f"SELECT COUNT(*) FROM public.{table_name}"
+        ).scalar()
+
+
+if __name__ == "__main__":
+
+    nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    table = make_table(nb_records)
+    engine = get_db_engine()
+
+    # Empty copies of the raw table (columns, defaults, unique key)
+    with engine.begin() as conn:
+        for table_name in TABLES:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS public.{table_name}")
+            conn.exec_driver_sql(
+                f"CREATE TABLE public.{table_name} "
+                "(LIKE public.raw_rockets INCLUDING ALL)"
+            )
+
+    print(f"{nb_records} records")
+
+    try:
+        # Previous loader: pandas conversion + INSERT
+        start = time.perf_counter()
+        save_to_postgres_pandas(table, "bench_to_sql", schema="public")
+        duration = time.perf_counter() - start
+        print(
+            f"to_sql       : {duration:.3f}s -> {nb_records / duration:,.0f} rows/s, "
+            f"{count_rows(engine, 'bench_to_sql')} rows in table"
+        )
+
+        # Arrow -> COPY append
+        start = time.perf_counter()
+        save_to_postgres(table, "bench_copy", schema="public")
+        duration = time.perf_counter() - start
+        print(
+            f"copy         : {duration:.3f}s -> {nb_records / duration:,.0f} rows/s, "
+            f"{count_rows(engine, 'bench_copy')} rows in table"
+        )
+
+        # COPY + upsert, first load then the same rows again
+        for run in ["upsert", "upsert again"]:
+            start = time.perf_counter()
+            nb_rows = upsert_batches_to_postgres(
+                table.to_batches(max_chunksize=DB_COPY_BATCH_ROWS),
+                table_name="bench_upsert",
+                key="launch_id",
+                schema="public",
+                partition_key="launch_date",
+            )
+            duration = time.perf_counter() - start
+            print(
+                f"{run:<13}: {duration:.3f}s -> {nb_records / duration:,.0f} rows/s, "
+                f"{nb_rows['upserted']} rows written, "
+                f"{count_rows(engine, 'bench_upsert')} rows in table"
+            )
+
+    finally:
+        with engine.begin() as conn:
+            for table_name in TABLES:
+                conn.exec_driver_sql(f"DROP TABLE IF EXISTS public.{table_name}")
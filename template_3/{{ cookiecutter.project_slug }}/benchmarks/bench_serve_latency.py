@@ -0,0 +1,251 @@
+"""
+Benchmark of the latency of the scheduled runs: process work pool vs long-lived mode
+
+- process: each run starts a new interpreter which imports the flow and runs
+  it, as the worker of the process work pool does (`prefect/deploy.sh`). It
+  is a lower bound: the worker also polls the API and loads the flow run.
+- serve: the runs are called in the same process (`serve.py`), the modules,
+  schemas, HTTP session, database pool and dbt manifest are kept between
+  the runs.
+
+Each mode runs on a local stub of the launches API (the flow fetches up to
+`API_MAX_RECORDS` records), with new data at each run (`last_updated` of
+every launch moved forward, fingerprints and watermarks forgotten: every
+launch loaded, the models run) and without (same data as the last run,
+nothing loaded or transformed).
+
+The flows run in a temporary directory (the state of the project is not
+touched). The launches are loaded into `public.raw_rockets` (launch ids
+prefixed with `bench-`), they are deleted at the end and the models rebuilt.
+The database must be set up first (`setup/init_database.sh`), the variables
+of the dbt profile set (`.env`) and a Prefect API running.
+
+Usage:
+    python -m benchmarks.bench_serve_latency [nb_records] [nb_runs] [delay_ms]
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qsl
+
+from prefect.logging import disable_run_logger
+
+from core.config.path import PATH_DATA_STATE
+from core.config.settings import DBT_SOURCE_NAME
+from core.libs.db_utils import get_db_engine
+from core.libs.serve_utils import serve_flow
+from core.processing.orchestration import flow_rockets_launch, reset_clients
+from core.processing.transform import invoke_dbt
+from benchmarks.synthetic import make_launch_records
+
+TABLE_NAME = "raw_rockets"
+SELECT = ["--select", f"source:{DBT_SOURCE_NAME}.{TABLE_NAME}+"]
+
+# Run of the flow in a new interpreter (URL of the API as argument)
+PROCESS_RUN = (
+    "import sys\n"
+    "from core.processing.orchestration import flow_rockets_launch\n"
+    "flow_rockets_launch(url=sys.argv[1])\n"
+)
+
+
+def start_stub_api(records, delay):
+    """
+    Start a local stub of the launches API (limit/offset pages)
+
+    Args:
+        records: launch records served by the API
+        delay: delay of each response, in seconds
+
+    Returns:
+        ThreadingHTTPServer: running server
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            query = dict(parse_qsl(urlsplit(self.path).query))
+            limit = int(query.get("limit", 100))
+            offset = int(query.get("offset", 0))
+
+            body = json.dumps(
+                {
+                    "count": len(records),
+                    "next": None,
+                    "results": records[offset : offset + limit],
+                }
+            ).encode()
+
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server
+
+
+def reset_ingestion_state():
+    """
+    Forget the fingerprints and watermarks, so that each run loads the whole
+    window of the API
+    """
+    for pattern in ["fingerprint_*.json", "watermark_*.json"]:
+        for path in Path(PATH_DATA_STATE).glob(pattern):
+            path.unlink()
+
+
+def update_records(records):
+    """
+    Move the `last_updated` of every launch one second after the latest one,
+    so that the upsert finds every row changed and the models run
+
+    Args:
+        records: launch records served by the API (updated in place)
+    """
+    latest = max(
+        datetime.strptime(record["last_updated"], "%Y-%m-%dT%H:%M:%SZ")
+        for record in records
+    )
+    last_updated = (latest + timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    for record in records:
+        record["last_updated"] = last_updated
+
+
+def new_data_run(records):
+    """
+    Serve new data to the next run: records updated, ingestion state forgotten
+
+    Args:
+        records: launch records served by the API (updated in place)
+    """
+    update_records(records)
+    reset_ingestion_state()
+
+
+def run_process(url, records, nb_runs, new_data):
+    """
+    Durations of the runs of the flow, each in a new interpreter
+
+    Args:
+        url: URL of the API
+        records: launch records served by the API
+        nb_runs: number of runs (after a first run to warm up)
+        new_data: update the records and forget the ingestion state before each run
+
+    Returns:
+        list: duration of each run (seconds)
+    """
+    durations = []
+    for _ in range(nb_runs + 1):
+        if new_data:
+            new_data_run(records)
+
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", PROCESS_RUN, url], capture_output=True, check=True
+        )
+        durations.append(time.perf_counter() - start)
+
+    return durations[1:]
+
+
+def run_serve(url, records, nb_runs, new_data):
+    """
+    Durations of the runs of the flow, all in the current process
+
+    Args:
+        url: URL of the API
+        records: launch records served by the API
+        nb_runs: number of runs (after a first run to warm up)
+        new_data: update the records and forget the ingestion state before each run
+
+    Returns:
+        list: duration of each run (seconds)
+    """
+    durations = []
+
+    def timed_flow(**kwargs):
+        if new_data:
+            new_data_run(records)
+
+        start = time.perf_counter()
+        state = flow_rockets_launch(**kwargs)
+        durations.append(time.perf_counter() - start)
+        return state
+
+    state = serve_flow(
+        timed_flow,
+        interval=0,
+        parameters={"url": url, "keep_warm": True},
+        reset=reset_clients,
+        max_runs=nb_runs + 1,
+    )
+    if state.is_failed():
+        raise RuntimeError(f"Flow run failed: {state.message}")
+
+    return durations[1:]
+
+
+if __name__ == "__main__":
+
+    nb_records = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    nb_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    delay = (int(sys.argv[3]) if len(sys.argv) > 3 else 50) / 1000
+
+    # Launches of the benchmark, apart from the launches of the API
+    records = make_launch_records(nb_records)
+    for record in records:
+        record["id"] = f"bench-{record['id']}"
+
+    server = start_stub_api(records, delay)
+    url = (
+        f"http://127.0.0.1:{server.server_port}/launches/"
+        "?limit=100&offset=0&ordering=-last_updated&mode=list"
+    )
+
+    print(f"{nb_records} records, {nb_runs} runs, {delay * 1000:.0f} ms per request")
+
+    # Run in a temporary directory, with the config, models and profile of the project
+    project_dir = Path.cwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ["core", "dbt_project", ".env"]:
+                if (project_dir / name).exists():
+                    os.symlink(project_dir / name, Path(tmp_dir) / name)
+            os.chdir(tmp_dir)
+
+            try:
+                for new_data in [True, False]:
+                    print("new data at each run" if new_data else "no new data")
+
+                    for name, run in [("process", run_process), ("serve", run_serve)]:
+                        durations = sorted(run(url, records, nb_runs, new_data))
+                        print(
+                            f"  {name:<8}: median {durations[len(durations) // 2]:.3f}s, "
+                            f"min {durations[0]:.3f}s, max {durations[-1]:.3f}s"
+                        )
+            finally:
+                os.chdir(project_dir)
+    finally:
+        server.shutdown()
+
+        with get_db_engine().begin() as conn:
+            conn.exec_driver_sql(
+                f"DELETE FROM public.{TABLE_NAME} WHERE starts_with(launch_id, 'bench-')"
+            )
+        with disable_run_logger():
+            invoke_dbt(["run", "--full-refresh", *SELECT])
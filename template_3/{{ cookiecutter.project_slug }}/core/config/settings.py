@@ -0,0 +1,27 @@
+# File with Settings for the project
+
+# api settings
+API_MAX_RECORDS = 1000  # max records fetched per run (None to fetch everything)
+API_MAX_WORKERS = 4  # pages fetched concurrently
+API_MAX_PER_HOST = 4  # concurrent requests allowed on the same host
+API_RATE_LIMIT = 5  # max requests per second on the same host
+API_MAX_RETRIES = 5
+API_BACKOFF_FACTOR = 0.5  # sleep between retries: {backoff factor} * 2 ** (retry - 1)
+API_TIMEOUT = 30  # seconds
+API_CACHE_ENABLED = True  # conditional requests, responses cached on disk
+API_CACHE_MAX_BYTES = 256 * 1024 * 1024  # compressed responses kept on disk
+API_WATERMARK_FIELD = "last_updated"  # field of the incremental extraction
+
+# database settings
+DB_COPY_BATCH_ROWS = 50_000  # rows serialized per COPY chunk
+DB_COPY_BUFFER_SIZE = 1024 * 1024  # bytes sent per COPY read
+DB_POOL_SIZE = 5  # connections kept open in the pool
+DB_MAX_OVERFLOW = 5  # extra connections opened when the pool is exhausted
+DB_POOL_RECYCLE = 1800  # seconds before a connection is replaced
+DB_SECRET_TTL = 300  # seconds the connection string (Prefect Secret) is cached
+
+# dbt settings
+DBT_SOURCE_NAME = "raw"  # dbt source of the raw tables (dbt_project/models/sources.yml)
+
+# flow settings
+FLOW_SERVE_INTERVAL = 60  # seconds between the runs of the long-lived mode (serve.py)
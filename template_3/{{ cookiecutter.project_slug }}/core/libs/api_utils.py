@@ -0,0 +1,473 @@
+"""
+API utilities for paginated and concurrent HTTP ingestion
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Lazy imports: requests is imported at the first request
+from core.libs.lazy_utils import lazy_import
+
+requests = lazy_import("requests")
+adapters = lazy_import("requests.adapters")
+retry_utils = lazy_import("urllib3.util.retry")
+
+# Settings
+from core.config.settings import (
+    API_MAX_WORKERS,
+    API_MAX_PER_HOST,
+    API_RATE_LIMIT,
+    API_MAX_RETRIES,
+    API_BACKOFF_FACTOR,
+    API_TIMEOUT,
+    API_CACHE_ENABLED,
+    API_WATERMARK_FIELD,
+)
+
+# HTTP cache
+from core.libs.http_cache import get_http_cache
+
+# Shared HTTP session and per-host limiters
+_session = None
+_session_lock = threading.Lock()
+_host_limiters = {}
+_host_limiters_lock = threading.Lock()
+
+
+class HostLimiter:
+    """
+    Limit the number of concurrent requests and the request rate on a host
+
+    Args:
+        max_concurrency: max requests in flight on the host
+        rate_limit: max requests per second on the host (None for no limit)
+    """
+
+    def __init__(self, max_concurrency, rate_limit=None):
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.interval = 1 / rate_limit if rate_limit else 0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.semaphore.acquire()
+
+        # Reserve the next request slot and wait for it
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+        return self
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+
+
+def get_http_session():
+    """
+    Get the HTTP session shared by all the API calls
+
+    The session keeps a pool of connections per host and retries failed
+    requests (connection errors, 429 and 5xx) with an exponential backoff,
+    respecting the `Retry-After` header sent by the API.
+
+    Returns:
+        requests.Session: HTTP session
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            retry = retry_utils.Retry(
+                total=API_MAX_RETRIES,
+                backoff_factor=API_BACKOFF_FACTOR,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"],
+                respect_retry_after_header=True,
+            )
+            adapter = adapters.HTTPAdapter(
+                pool_connections=API_MAX_PER_HOST,
+                pool_maxsize=API_MAX_PER_HOST,
+                max_retries=retry,
+            )
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+
+        return _session
+
+
+def reset_http_session():
+    """
+    Close the shared HTTP session (e.g. after a failed run of the long-lived mode)
+
+    The next call to `get_http_session` creates a new session.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_host_limiter(url):
+    """
+    Get the limiter of the host of an URL
+
+    Args:
+        url: URL of the request
+
+    Returns:
+        HostLimiter: limiter of the host
+    """
+    host = urlsplit(url).netloc
+
+    with _host_limiters_lock:
+        if host not in _host_limiters:
+            _host_limiters[host] = HostLimiter(API_MAX_PER_HOST, API_RATE_LIMIT)
+
+        return _host_limiters[host]
+
+
+def set_query_params(url, **params):
+    """
+    Set (or replace) query parameters of an URL
+
+    Args:
+        url: URL to update
+        params: query parameters to set
+
+    Returns:
+        str: URL with the updated query parameters
+    """
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update({key: str(value) for key, value in params.items()})
+
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def fetch_json(url, cache=API_CACHE_ENABLED, **kwargs):
+    """
+    Fetch a JSON document with the shared session and host limiter
+
+    With `cache`, the responses are kept on disk with their validators
+    (ETag, Last-Modified) and the request is conditional: an unchanged
+    document (`304 Not Modified`) is served from the cache, without downloading
+    it again, see `core.libs.http_cache`.
+
+    Args:
+        url: URL of the API
+        cache: use the HTTP cache
+        kwargs: additional parameters for the request
+
+    Returns:
+        dict: JSON response from the API
+    """
+    kwargs.setdefault("timeout", API_TIMEOUT)
+
+    http_cache = get_http_cache() if cache else None
+    if http_cache:
+        kwargs["headers"] = {
+            **http_cache.get_validators(url),
+            **kwargs.get("headers", {}),
+        }
+
+    with get_host_limiter(url):
+        response = get_http_session().get(url, **kwargs)
+
+    # Not modified -> body from the cache
+    if http_cache and response.status_code == 304:
+        body = http_cache.load(url)
+        if body is not None:
+            return json.loads(body)
+
+        # Entry evicted meanwhile -> download it again
+        kwargs["headers"] = {
+            key: value
+            for key, value in kwargs["headers"].items()
+            if key not in ("If-None-Match", "If-Modified-Since")
+        }
+        with get_host_limiter(url):
+            response = get_http_session().get(url, **kwargs)
+
+    response.raise_for_status()
+
+    # Cache the responses which can be revalidated
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    no_store = "no-store" in response.headers.get("Cache-Control", "")
+    if http_cache and (etag or last_modified) and not no_store:
+        http_cache.store(url, response.content, etag, last_modified)
+
+    return response.json()
+
+
+def iter_pages(url, max_records=None, max_workers=API_MAX_WORKERS, **kwargs):
+    """
+    Iterate over the pages of a paginated API endpoint
+
+    - Fetch the first page to get the total number of records (`count`)
+    - Fetch the next `limit/offset` pages concurrently, yielded in order
+    - Follow the `next` links when the API does not give `limit` or `count`
+
+    Only `max_workers * 2` pages are in flight at any time, so a slow consumer
+    keeps the memory bounded.
+
+    Args:
+        url: URL of the API (first page)
+        max_records: max number of records to fetch (None for all)
+        max_workers: number of pages fetched concurrently
+        kwargs: additional parameters for the requests
+
+    Yields:
+        list: records of each page
+    """
+    query = dict(parse_qsl(urlsplit(url).query))
+
+    # First page
+    page = fetch_json(url, **kwargs)
+    records = page.get("results", [])[:max_records]
+    yield records
+
+    fetched = len(records)
+    count = page.get("count")
+
+    # No limit/offset paging -> follow the next links
+    if count is None or "limit" not in query:
+        next_url = page.get("next")
+        while next_url and (max_records is None or fetched < max_records):
+            page = fetch_json(next_url, **kwargs)
+            remaining = None if max_records is None else max_records - fetched
+            records = page.get("results", [])[:remaining]
+            yield records
+
+            fetched += len(records)
+            next_url = page.get("next")
+        return
+
+    # limit/offset paging -> fetch the remaining pages concurrently
+    limit = int(query["limit"])
+    start = int(query.get("offset", 0))
+    end = count if max_records is None else min(count, start + max_records)
+
+    pages = [
+        (set_query_params(url, limit=limit, offset=offset), min(limit, end - offset))
+        for offset in range(start + limit, end, limit)
+    ]
+
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for page_url, size in pages:
+            pending.append((executor.submit(fetch_json, page_url, **kwargs), size))
+
+            if len(pending) >= max_workers * 2:
+                future, size = pending.popleft()
+                yield future.result().get("results", [])[:size]
+
+        while pending:
+            future, size = pending.popleft()
+            yield future.result().get("results", [])[:size]
+    finally:
+        # Consumer stopped early or a page failed -> drop the queued pages
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def parse_timestamp(value):
+    """
+    Parse an ISO 8601 timestamp of the API (naive values are UTC)
+
+    Args:
+        value: timestamp, e.g. 2025-01-01T12:00:00Z
+
+    Returns:
+        datetime: parsed timestamp, None if missing or invalid
+    """
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+    return timestamp
+
+
+class Watermark:
+    """
+    Watermark of an incremental extraction: the last update already fetched
+
+    The records are fetched oldest first from the watermark (inclusive). The
+    watermark moves to the newest update fetched, also when the extraction
+    is cut off by `max_records`: the next run goes on from there. The keys
+    of the records at the watermark are kept with it, so these records are
+    not fetched again by the next runs (only their newer updates are).
+
+    When the API ignores the ordering (records not oldest first), a cut-off
+    extraction keeps the watermark until the records reach it.
+
+    Args:
+        field: field of the records holding the time of the last update
+        state: state of the watermark (value, keys of the records at the
+            value), or only its value (previous versions), None for a full
+            extraction
+        max_records: max number of records fetched per run
+        key: field of the id of the records
+    """
+
+    def __init__(
+        self, field=API_WATERMARK_FIELD, state=None, max_records=None, key="id"
+    ):
+        if not isinstance(state, dict):
+            state = {"value": state, "keys": []}
+
+        self.field = field
+        self.key = key
+        self.value = state["value"]
+        self.keys = set(state["keys"])
+        self.since = parse_timestamp(self.value)
+        self.max_records = max_records
+        self.newest = None
+        self.newest_keys = set()
+        self.oldest = None
+        self.last = None
+        self.count = 0
+        self.in_order = True
+        self.older = False
+        self.reached = False
+
+    def filter(self, records):
+        """
+        Keep the records updated since the watermark (kept if unknown), except
+        the records at the watermark already fetched, and track them
+
+        Args:
+            records: records of a page
+
+        Returns:
+            list: records updated since the watermark
+        """
+        updated = []
+        for record in records:
+            updated_at = parse_timestamp(record.get(self.field))
+            if updated_at is None:
+                updated.append(record)
+                continue
+
+            # Order of the records (oldest first when the API applies the ordering)
+            if self.last is not None and updated_at < self.last:
+                self.in_order = False
+            self.last = updated_at
+
+            if self.since is None or updated_at > self.since:
+                updated.append(record)
+            elif updated_at == self.since:
+                if record.get(self.key) not in self.keys:
+                    updated.append(record)
+            else:
+                self.older = True
+
+        self.track(updated)
+        return updated
+
+    def track(self, records):
+        """
+        Track the updates of the records fetched
+        """
+        self.count += len(records)
+
+        for record in records:
+            updated_at = parse_timestamp(record.get(self.field))
+            if updated_at is None:
+                continue
+            if self.newest is None or updated_at > self.newest[0]:
+                self.newest = (updated_at, record[self.field])
+                self.newest_keys = set()
+            if updated_at == self.newest[0]:
+                self.newest_keys.add(record.get(self.key))
+            if self.oldest is None or updated_at < self.oldest:
+                self.oldest = updated_at
+
+    def next_state(self):
+        """
+        Get the state of the watermark for the next run
+
+        Returns:
+            dict: value (newest update fetched, or the current watermark) and
+                keys of the records fetched at this value
+        """
+        state = {"value": self.value, "keys": sorted(self.keys)}
+        if self.newest is None:
+            return state
+
+        # Not oldest first, and cut off before the watermark -> the updates
+        # in between are pending
+        truncated = self.max_records is not None and self.count >= self.max_records
+        reached = self.reached or self.since is None or self.oldest <= self.since
+        if truncated and not (self.in_order or reached):
+            return state
+
+        # Same value -> the records fetched at the watermark by the previous runs too
+        keys = self.newest_keys
+        if self.newest[0] == self.since:
+            keys = keys | self.keys
+
+        return {
+            "value": self.newest[1],
+            "keys": sorted(key for key in keys if key is not None),
+        }
+
+
+def iter_updated_pages(url, watermark, max_records=None, **kwargs):
+    """
+    Iterate over the pages of the records updated since the watermark
+
+    The API is asked for the records updated since the watermark, oldest
+    first (`<field>__gte`, `ordering=<field>`). When it ignores the ordering
+    (newest first), the pages are followed only until the records are older
+    than the watermark.
+
+    Args:
+        url: URL of the API (first page)
+        watermark: watermark of the extraction, see `Watermark`
+        max_records: max number of records to fetch (None for all)
+        kwargs: additional parameters for the requests (see `iter_pages`)
+
+    Yields:
+        list: records of each page updated since the watermark
+    """
+    if watermark.value:
+        url = set_query_params(
+            url,
+            **{
+                f"{watermark.field}__gte": watermark.value,
+                "ordering": watermark.field,
+            },
+        )
+
+    pages = iter_pages(url, max_records=max_records, **kwargs)
+    try:
+        for records in pages:
+            yield watermark.filter(records)
+
+            # Newest first with records older than the watermark -> the next
+            # pages are older
+            if watermark.older and not watermark.in_order:
+                watermark.reached = True
+                return
+    finally:
+        pages.close()
@@ -2,55 +2,336 @@
 Database utilities for PostgreSQL connection and operations
 """
 
+import io
 import os
-from sqlalchemy import create_engine
+import time
+import threading
+from itertools import chain
+
+from dotenv import load_dotenv
 from prefect.blocks.system import Secret
 
+# Lazy imports: pyarrow and sqlalchemy are imported at their first use
+from core.libs.lazy_utils import lazy_import
+
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+pa_csv = lazy_import("pyarrow.csv")
+sqlalchemy = lazy_import("sqlalchemy")
+
+# Settings
+from core.config.settings import (
+    DB_COPY_BATCH_ROWS,
+    DB_COPY_BUFFER_SIZE,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_SECRET_TTL,
+)
+
+# Resolved connection string (value, expiry time) and engines by connection string
+_conn_string = (None, 0.0)
+_conn_string_lock = threading.Lock()
+_engines = {}
+_engines_lock = threading.Lock()
+
 
 def get_db_connection_string():
     """
     Get database connection string from environment variables or Prefect secrets
 
+    The resolved connection string is cached for `DB_SECRET_TTL` seconds,
+    so the Prefect API is not called on every load.
+
     Returns:
         str: PostgreSQL connection string
     """
-    try:
-        # Try to get connection string from Prefect Secret
-        db_secret = Secret.load("postgres-connection")
-        return db_secret.get()
-    except:
-        # Fallback to environment variables
-        db_user = os.getenv("DB_USER", "postgres")
-        db_password = os.getenv("DBT_ENV_SECRET_DB_PASSWORD", "root")
-        db_host = os.getenv("DB_HOST", "localhost")
-        db_port = os.getenv("DB_PORT", "5432")
-        db_name = os.getenv("DB_NAME", "db_azert")
+    global _conn_string
 
-        return f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+    with _conn_string_lock:
+        conn_string, expires_at = _conn_string
+        if conn_string is not None and time.monotonic() < expires_at:
+            return conn_string
+
+        try:
+            # Try to get connection string from Prefect Secret
+            db_secret = Secret.load("postgres-connection")
+            conn_string = db_secret.get()
+        except Exception:
+            # Fallback to environment variables (and the `.env` file)
+            load_dotenv()
+            db_user = os.getenv("DB_USER", "postgres")
+            db_password = os.getenv("DBT_ENV_SECRET_DB_PASSWORD", "root")
+            db_host = os.getenv("DB_HOST", "localhost")
+            db_port = os.getenv("DB_PORT", "5432")
+            db_name = os.getenv("DB_NAME", "db_azert")
+
+            conn_string = (
+                f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+            )
+
+        _conn_string = (conn_string, time.monotonic() + DB_SECRET_TTL)
+        return conn_string
 
 
 def get_db_engine():
     """
     Get SQLAlchemy engine for PostgreSQL
 
+    One engine (and connection pool) is created per connection string and
+    shared by all the loads of the process. Connections are checked before
+    use (pre-ping) and recycled, so a restarted server is handled.
+
     Returns:
         sqlalchemy.engine.Engine: Database engine
     """
     conn_string = get_db_connection_string()
-    return create_engine(conn_string)
 
+    with _engines_lock:
+        if conn_string not in _engines:
+            _engines[conn_string] = sqlalchemy.create_engine(
+                conn_string,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_recycle=DB_POOL_RECYCLE,
+                pool_pre_ping=True,
+            )
+
+        return _engines[conn_string]
+
+
+def dispose_engines():
+    """
+    Close the connection pools of all the engines (e.g. at the end of a flow)
+
+    The next call to `get_db_engine` creates a new engine.
+    """
+    global _conn_string
+
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+    with _conn_string_lock:
+        _conn_string = (None, 0.0)
+
+
+def batch_to_csv(batch):
+    """
+    Serialize a PyArrow RecordBatch to CSV for `COPY ... FROM STDIN`
+
+    Timestamps are cast to microseconds, the precision of PostgreSQL.
+
+    Args:
+        batch (pa.RecordBatch): batch to serialize
+
+    Returns:
+        bytes: CSV data, without header
+    """
+    columns = []
+    for field, column in zip(batch.schema, batch.columns):
+        if pa.types.is_timestamp(field.type) and field.type.unit == "ns":
+            column = pc.cast(column, pa.timestamp("us", tz=field.type.tz), safe=False)
+        columns.append(column)
+
+    buffer = io.BytesIO()
+    pa_csv.write_csv(
+        pa.RecordBatch.from_arrays(columns, names=batch.schema.names),
+        buffer,
+        write_options=pa_csv.WriteOptions(include_header=False),
+    )
+
+    return buffer.getvalue()
+
+
+class CSVBatchStream(io.RawIOBase):
+    """
+    Read-only file object of the CSV data of a stream of RecordBatches
+
+    The batches are serialized one at a time when the reader (COPY) needs
+    more data, so a whole stream is sent with a single COPY while the
+    memory is bounded by one batch.
+
+    Args:
+        batches: iterable of PyArrow RecordBatches
+    """
+
+    def __init__(self, batches):
+        self.batches = iter(batches)
+        self.buffer = memoryview(b"")
+        self.nb_rows = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        # Current batch consumed -> serialize the next one
+        while not self.buffer:
+            batch = next(self.batches, None)
+            if batch is None:
+                return 0
+
+            self.buffer = memoryview(batch_to_csv(batch))
+            self.nb_rows += batch.num_rows
+
+        size = min(len(b), len(self.buffer))
+        b[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
 
-def save_to_postgres(df, table_name, schema="raw", if_exists="append"):
+        return size
+
+
+def copy_batches(cursor, batches, table_name, columns):
+    """
+    Load PyArrow RecordBatches into a table with a single `COPY ... FROM STDIN`
+
+    Args:
+        cursor: psycopg2 cursor
+        batches: iterable of PyArrow RecordBatches
+        table_name (str): quoted name of the table
+        columns (list): quoted names of the columns, in the order of the batches
+
+    Returns:
+        int: number of rows copied
+    """
+    query = f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    stream = CSVBatchStream(batches)
+
+    cursor.copy_expert(query, stream, size=DB_COPY_BUFFER_SIZE)
+
+    return stream.nb_rows
+
+
+def save_to_postgres(table, table_name, schema="raw", if_exists="append"):
     """
     Save data to PostgreSQL database
 
+    The PyArrow table is sent with COPY, without conversion to pandas.
+    The table must exist in the database (see `setup/create_table.sql`).
+
     Args:
-        df (pd.DataFrame): DataFrame to save
+        table (pa.Table): Table to save
         table_name (str): Table name
         schema (str): Schema name
-        if_exists (str): How to behave if table exists (replace, append, fail)
+        if_exists (str): How to behave with the rows of the table (append, replace)
+
+    Returns:
+        int: number of rows saved
     """
+    if if_exists not in ("append", "replace"):
+        raise ValueError(f"if_exists must be 'append' or 'replace', got {if_exists}")
+
     engine = get_db_engine()
-    df.to_sql(
-        name=table_name, con=engine, schema=schema, if_exists=if_exists, index=False
-    )
+    quote = engine.dialect.identifier_preparer.quote
+
+    target = f"{quote(schema)}.{quote(table_name)}"
+    columns = [quote(name) for name in table.column_names]
+
+    with engine.begin() as conn:
+        if if_exists == "replace":
+            conn.exec_driver_sql(f"TRUNCATE TABLE {target}")
+
+        cursor = conn.connection.cursor()
+        return copy_batches(
+            cursor,
+            table.to_batches(max_chunksize=DB_COPY_BATCH_ROWS),
+            target,
+            columns,
+        )
+
+
+def upsert_batches_to_postgres(
+    batches, table_name, key, schema="public", loaded_at=None, partition_key=None
+):
+    """
+    Upsert a stream of PyArrow RecordBatches into a PostgreSQL table
+
+    - COPY the batches into a temporary staging table
+    - Keep the last row of each key, drop the rows without key
+    - INSERT ... ON CONFLICT (key) DO UPDATE into the table, the rows
+      which did not change are not rewritten
+    - Partitioned table: the unique key is (key, partition_key), a row whose
+      partition key changed (e.g. launch rescheduled) is deleted then
+      inserted into its new partition
+    - Set the `loaded_at` column (if any) to the time of the load on the
+      rows inserted or changed, for the incremental models downstream
+
+    Everything runs in a single transaction: a failed stream loads nothing,
+    and loading the same data again changes nothing.
+
+    Args:
+        batches: iterable of PyArrow RecordBatches (same schema)
+        table_name (str): Table name
+        key (str): column with a unique constraint in the table (e.g. launch_id)
+        schema (str): Schema name
+        loaded_at (str): timestamp column set on the rows inserted or changed
+        partition_key (str): partition column of the table, part of the unique key
+
+    Returns:
+        dict: number of rows staged and upserted (inserted or changed)
+    """
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None:
+        return {"staged": 0, "upserted": 0}
+
+    engine = get_db_engine()
+    quote = engine.dialect.identifier_preparer.quote
+
+    target = f"{quote(schema)}.{quote(table_name)}"
+    staging = quote(f"_staging_{table_name}")
+    key = quote(key)
+    columns = [quote(name) for name in first.schema.names]
+    conflict = key
+    if partition_key:
+        partition_key = quote(partition_key)
+        conflict = f"{key}, {partition_key}"
+    values = [col for col in columns if col not in (key, partition_key)]
+
+    col_list = ", ".join(columns)
+    set_list = ", ".join(f"{col} = EXCLUDED.{col}" for col in values)
+    target_values = ", ".join(f"target.{col}" for col in values)
+    new_values = ", ".join(f"EXCLUDED.{col}" for col in values)
+
+    # Time of the load on the rows inserted or changed
+    insert_list, select_list = col_list, col_list
+    if loaded_at:
+        loaded_at = quote(loaded_at)
+        insert_list = f"{col_list}, {loaded_at}"
+        select_list = f"{col_list}, now()"
+        set_list = f"{set_list}, {loaded_at} = now()"
+
+    with engine.begin() as conn:
+        # Staging table: same columns as the table + load order
+        conn.exec_driver_sql(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT {col_list} FROM {target} WITH NO DATA"
+        )
+        conn.exec_driver_sql(f"ALTER TABLE {staging} ADD COLUMN _seq BIGSERIAL")
+
+        # Bulk load
+        cursor = conn.connection.cursor()
+        nb_staged = copy_batches(cursor, chain([first], batches), staging, columns)
+
+        # Rows moved to another partition -> deleted, inserted by the merge
+        if partition_key:
+            conn.exec_driver_sql(
+                f"DELETE FROM {target} AS target USING ("
+                f"SELECT DISTINCT ON ({key}) {key}, {partition_key} FROM {staging} "
+                f"WHERE {key} IS NOT NULL ORDER BY {key}, _seq DESC) AS latest "
+                f"WHERE target.{key} = latest.{key} "
+                f"AND target.{partition_key} IS DISTINCT FROM latest.{partition_key}"
+            )
+
+        # Merge
+        result = conn.exec_driver_sql(
+            f"INSERT INTO {target} AS target ({insert_list}) "
+            f"SELECT DISTINCT ON ({key}) {select_list} FROM {staging} "
+            f"WHERE {key} IS NOT NULL "
+            f"ORDER BY {key}, _seq DESC "
+            f"ON CONFLICT ({conflict}) DO UPDATE SET {set_list} "
+            f"WHERE ({target_values}) IS DISTINCT FROM ({new_values})"
+        )
+
+    return {"staged": nb_staged, "upserted": result.rowcount}
@@ -0,0 +1,211 @@
+"""
+Generator of the PostgreSQL DDL of the tables of the config YAML file
+
+The columns come from the schema of each table (the same schema is used by
+the ingestion), the physical layout from its `storage` section:
+
+- key: column of the API id, unique with the partition column (upsert key)
+- surrogate_key: serial column, primary key with the partition column
+- loaded_at: time of the last load of each row (incremental dbt models)
+- partition: range partitions of a datetime column, by a number of years
+- indexes: columns and method (btree, brin) of the indexes
+
+The statements are idempotent (`IF NOT EXISTS`): the missing columns and
+indexes are added to the tables created by a previous version.
+
+Usage (from the project directory, see `setup/init_database.sh`):
+    python -m core.libs.ddl_utils > setup/create_table.sql
+"""
+
+import yaml
+
+# Paths
+from core.config.path import PATH_CONFIG_SCHEMA
+
+# PostgreSQL types of the columns types of the config YAML file
+POSTGRES_TYPES = {
+    "integer": "BIGINT",
+    "float": "DOUBLE PRECISION",
+    "string": "TEXT",
+    "datetime": "TIMESTAMPTZ",
+    "bool": "BOOLEAN",
+}
+
+
+def build_columns_ddl(data_schema):
+    """
+    Build the definition of each column of a table
+
+    Args:
+        data_schema (dict): Schema of the table
+
+    Returns:
+        list: (name, type, constraints) of each column
+    """
+    storage = data_schema.get("storage", {})
+    columns = []
+
+    if "surrogate_key" in storage:
+        columns.append((storage["surrogate_key"], "SERIAL", ""))
+
+    for col in data_schema["columns"]:
+        constraints = "" if col.get("nullable", True) else " NOT NULL"
+        columns.append((col["name"], POSTGRES_TYPES[col["type"]], constraints))
+
+    if "loaded_at" in storage:
+        columns.append((storage["loaded_at"], "TIMESTAMPTZ", " NOT NULL DEFAULT now()"))
+
+    return columns
+
+
+def build_partitions_ddl(table_name, partition, schema="public"):
+    """
+    Build the range partitions of a table, one per `years` years, and a
+    default partition for the values out of the range
+
+    A table created by a previous version is not partitioned: the
+    partitions are skipped (with a notice), the table must be recreated.
+
+    Args:
+        table_name (str): Table name
+        partition (dict): column, years, start and end (years) of the partitions
+        schema (str): Schema name
+
+    Returns:
+        list: statements of the partitions (DO block)
+    """
+    target = f"{schema}.{table_name}"
+    statements = [
+        "DO $$",
+        "BEGIN",
+        "\tIF NOT EXISTS (SELECT 1 FROM pg_partitioned_table "
+        f"WHERE partrelid = '{target}'::regclass) THEN",
+        f"\t\tRAISE NOTICE '{target} is not partitioned, recreate it to partition it';",
+        "\t\tRETURN;",
+        "\tEND IF;",
+    ]
+
+    for year in range(partition["start"], partition["end"], partition["years"]):
+        end = min(year + partition["years"], partition["end"])
+        statements.append(
+            f"\tCREATE TABLE IF NOT EXISTS {target}_{year} PARTITION OF {target} "
+            f"FOR VALUES FROM ('{year}-01-01 00:00:00+00') TO ('{end}-01-01 00:00:00+00');"
+        )
+
+    statements += [
+        f"\tCREATE TABLE IF NOT EXISTS {target}_default PARTITION OF {target} DEFAULT;",
+        "END",
+        "$$;",
+    ]
+
+    return statements
+
+
+def generate_table_ddl(data_schema, schema="public"):
+    """
+    Generate the DDL of a table: table, partitions, columns of the previous
+    versions, unique key and indexes
+
+    Args:
+        data_schema (dict): Schema of the table
+        schema (str): Schema name
+
+    Returns:
+        str: SQL statements
+    """
+    table_name = data_schema["name"]
+    target = f"{schema}.{table_name}"
+    storage = data_schema.get("storage", {})
+    partition = storage.get("partition")
+    columns = build_columns_ddl(data_schema)
+
+    # Unique constraints of a partitioned table include the partition column
+    partition_columns = [partition["column"]] if partition else []
+
+    # Table
+    definitions = [
+        f"\t{name} {type_}{constraints}" for name, type_, constraints in columns
+    ]
+    if "surrogate_key" in storage:
+        primary_key = ", ".join([storage["surrogate_key"], *partition_columns])
+        definitions.append(f"\tPRIMARY KEY ({primary_key})")
+
+    statements = [
+        f"-- {table_name}: {data_schema.get('description', '')}",
+        f"CREATE TABLE IF NOT EXISTS {target} (",
+        ",\n".join(definitions),
+        f") PARTITION BY RANGE ({partition['column']});" if partition else ");",
+    ]
+
+    # Partitions
+    if partition:
+        statements += [
+            "",
+            f"-- Partitions of {partition['column']}, by {partition['years']} years",
+            *build_partitions_ddl(table_name, partition, schema),
+        ]
+
+    # Columns added since the creation of the table (previous versions)
+    statements += ["", "-- Tables created by a previous version: missing columns"]
+    for name, type_, constraints in columns:
+        if type_ == "SERIAL":
+            continue
+        # NOT NULL without default cannot be added to a table with rows
+        if "DEFAULT" not in constraints:
+            constraints = ""
+        statements.append(
+            f"ALTER TABLE {target} ADD COLUMN IF NOT EXISTS {name} {type_}{constraints};"
+        )
+
+    # Unique key (key of the upserts)
+    if "key" in storage:
+        key_columns = [storage["key"], *partition_columns]
+        statements += [
+            "",
+            "-- Key of the upserts",
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {table_name}_{'_'.join(key_columns)}_key "
+            f"ON {target} ({', '.join(key_columns)});",
+        ]
+
+    # Indexes of the queries
+    if storage.get("indexes"):
+        statements += ["", "-- Indexes"]
+        for index in storage["indexes"]:
+            method = index.get("method", "btree")
+            name = f"{table_name}_{'_'.join(index['columns'])}_{method}"
+            statements.append(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {target} "
+                f"USING {method} ({', '.join(index['columns'])});"
+            )
+
+    return "\n".join(statements)
+
+
+def generate_ddl(file_path=PATH_CONFIG_SCHEMA, schema="public"):
+    """
+    Generate the DDL of all the tables of the config YAML file
+
+    Args:
+        file_path (str): Path to the YAML file
+        schema (str): Schema name
+
+    Returns:
+        str: SQL script
+    """
+    with open(file_path, "r") as file:
+        config = yaml.safe_load(file)
+
+    tables = [
+        generate_table_ddl(table, schema) for table in config["datamodel"]["tables"]
+    ]
+
+    header = (
+        f"-- Generated from {file_path} by `python -m core.libs.ddl_utils`, "
+        "do not edit\n\n"
+    )
+    return header + "\n\n".join(tables) + "\n"
+
+
+if __name__ == "__main__":
+
+    print(generate_ddl(), end="")
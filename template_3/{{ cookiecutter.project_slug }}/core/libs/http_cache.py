@@ -0,0 +1,182 @@
+"""
+HTTP cache: API responses stored on disk and revalidated with conditional requests
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+# Paths
+from core.config.path import PATH_DATA_CACHE
+
+# Settings
+from core.config.settings import API_CACHE_MAX_BYTES
+
+# Cache shared by all the API calls
+_http_cache = None
+_http_cache_lock = threading.Lock()
+
+
+class HttpCache:
+    """
+    Responses of the API stored on disk, compressed, with their validators
+
+    Each response is saved as `<key>.gz` (gzip body) and `<key>.json`
+    (url, ETag, Last-Modified, size), the key being the hash of the URL.
+    The validators are sent back on the next request of the URL
+    (`If-None-Match`, `If-Modified-Since`), a `304 Not Modified` response
+    is then served from the cache.
+
+    The least recently used responses are evicted when the compressed bodies
+    exceed `max_bytes`.
+
+    Args:
+        cache_dir: directory of the cache
+        max_bytes: max size of the compressed bodies on disk
+    """
+
+    def __init__(self, cache_dir=PATH_DATA_CACHE, max_bytes=API_CACHE_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "stored": 0, "bytes_saved": 0}
+
+        # Size of each entry, least recently used first
+        self.entries = OrderedDict()
+        self.size = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        bodies = sorted(self.cache_dir.glob("*.gz"), key=lambda p: p.stat().st_mtime)
+        for body in bodies:
+            self.entries[body.stem] = body.stat().st_size
+            self.size += body.stat().st_size
+
+    def get_key(self, url):
+        """
+        Key of an URL in the cache
+        """
+        return hashlib.blake2b(url.encode(), digest_size=16).hexdigest()
+
+    def get_validators(self, url):
+        """
+        Get the conditional headers of a cached URL
+
+        Args:
+            url: URL of the request
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers (empty if not cached)
+        """
+        key = self.get_key(url)
+
+        with self.lock:
+            if key not in self.entries:
+                return {}
+
+        try:
+            with open(self.cache_dir / f"{key}.json", "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        return headers
+
+    def load(self, url):
+        """
+        Load the body of a cached URL and mark it as recently used
+
+        Args:
+            url: URL of the request
+
+        Returns:
+            bytes: body of the response, None if not cached
+        """
+        key = self.get_key(url)
+        body_path = self.cache_dir / f"{key}.gz"
+
+        # The order of the entries is rebuilt from the mtime on the next run.
+        # Evicted by another request meanwhile -> not cached, downloaded again
+        try:
+            with gzip.open(body_path, "rb") as f:
+                body = f.read()
+            os.utime(body_path)
+        except OSError:
+            return None
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(body)
+
+        return body
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """
+        Store the body of a response with its validators
+
+        Args:
+            url: URL of the request
+            body: body of the response
+            etag: ETag header of the response
+            last_modified: Last-Modified header of the response
+        """
+        key = self.get_key(url)
+        body_path = self.cache_dir / f"{key}.gz"
+        meta_path = self.cache_dir / f"{key}.json"
+
+        # Written next to the entry and moved in place
+        tmp_path = body_path.with_name(f"{body_path.name}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp_path, "wb", compresslevel=6) as f:
+            f.write(body)
+        size = tmp_path.stat().st_size
+        tmp_path.replace(body_path)
+
+        meta = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "size": len(body),
+        }
+        tmp_path = meta_path.with_name(f"{meta_path.name}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        tmp_path.replace(meta_path)
+
+        with self.lock:
+            self.size += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            self.stats["stored"] += 1
+
+            # Evict the least recently used entries
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                old_key, old_size = self.entries.popitem(last=False)
+                self.size -= old_size
+                for suffix in [".gz", ".json"]:
+                    (self.cache_dir / f"{old_key}{suffix}").unlink(missing_ok=True)
+
+
+def get_http_cache():
+    """
+    Get the HTTP cache shared by all the API calls
+
+    Returns:
+        HttpCache: HTTP cache
+    """
+    global _http_cache
+
+    with _http_cache_lock:
+        if _http_cache is None:
+            _http_cache = HttpCache()
+
+        return _http_cache
@@ -0,0 +1,67 @@
+"""
+Lazy imports of the heavy modules
+
+Each run of the flow starts a new interpreter and imports the flow modules,
+but a run does not use all the libraries they need (e.g. no compaction and
+no transformation when no new data was loaded). The heavy modules (pyarrow,
+requests, ...) are imported at the first access to one of their attributes,
+not when the modules of `core` are imported.
+
+Usage:
+    pa = lazy_import("pyarrow")
+    pc = lazy_import("pyarrow.compute")
+
+    pc.sum(pa.array([1, 2]))  # pyarrow imported here
+"""
+
+import sys
+import importlib
+
+
+class LazyModule:
+    """
+    Proxy of a module, imported at the first access to one of its attributes
+
+    The attributes read are kept by the proxy, the next accesses do not go
+    through `__getattr__`. A proxy is pickled by name (e.g. with a task sent
+    to a worker process), it stays lazy in the other process.
+
+    Args:
+        name: full name of the module (e.g. pyarrow.compute)
+    """
+
+    def __init__(self, name):
+        self._lazy_name = name
+
+    def __getattr__(self, attr):
+        # Not set yet (object being unpickled)
+        if attr == "_lazy_name":
+            raise AttributeError(attr)
+
+        module = importlib.import_module(self._lazy_name)
+        value = getattr(module, attr)
+        setattr(self, attr, value)
+        return value
+
+    def __reduce__(self):
+        return lazy_import, (self._lazy_name,)
+
+    def __repr__(self):
+        loaded = "loaded" if self._lazy_name in sys.modules else "not loaded"
+        return f"<lazy module '{self._lazy_name}' ({loaded})>"
+
+
+def lazy_import(name):
+    """
+    Get a module, imported at its first use
+
+    Args:
+        name: full name of the module
+
+    Returns:
+        The module if already imported, else a LazyModule
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    return LazyModule(name)
@@ -0,0 +1,47 @@
+"""
+State utilities: small state files persisted between the runs
+"""
+
+import json
+from pathlib import Path
+
+# Paths
+from core.config.path import PATH_DATA_STATE
+
+
+def read_state(name: str, default=None):
+    """
+    Read a JSON state
+
+    Args:
+        name: name of the state
+        default: value returned when the state does not exist
+
+    Returns:
+        value of the state
+    """
+    path = Path(PATH_DATA_STATE) / f"{name}.json"
+
+    if not path.exists():
+        return default
+
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_state(name: str, value):
+    """
+    Write a JSON state, atomically (written next to the state and moved in place)
+
+    Args:
+        name: name of the state
+        value: JSON serializable value
+    """
+    path = Path(PATH_DATA_STATE) / f"{name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(value, f)
+
+    tmp_path.replace(path)
@@ -1,39 +1,85 @@
-import yaml
-import pyarrow as pa
-import requests
+from __future__ import annotations
+
+import json
+import hashlib
+import threading
+from collections import defaultdict
 
 from prefect import task
 from prefect.logging import get_run_logger
-from prefect.variables import Variable
+from prefect.runtime import flow_run
 from prefect.artifacts import create_table_artifact
 
+# Lazy imports: pyarrow is imported at its first use
+from core.libs.lazy_utils import lazy_import
 
-@task(
-    name="update_data_artifact",
-    description="Update data artifact",
-    task_run_name="update-data-artifact",
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+
+# Api utils
+from core.libs.api_utils import fetch_json, iter_pages, iter_updated_pages, Watermark
+
+# Schema registry
+from core.libs.schema_registry import get_arrow_schema, get_schema
+
+# Entries of the data artifact, by flow run id
+_artifact_entries = defaultdict(list)
+_artifact_lock = threading.Lock()
+
+# Formats tried for the datetime values which are not ISO 8601
+DATETIME_FORMATS = [
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+]
+
+# ISO 8601 datetimes, with or without a timezone, cast by Arrow (also with
+# fractional seconds)
+ISO_DATETIME_PATTERN = (
+    r"^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d{1,9})?)?(Z|[+-]\d{2}(:?\d{2})?)?$"
 )
+ISO_ZONE_PATTERN = r"(Z|[+-]\d{2}(:?\d{2})?)$"
+
+
+def add_artifact_entry(run_id, entry):
+    """
+    Add an entry to the data artifact of a flow run
+
+    Args:
+        run_id: id of the flow run
+        entry: row of the artifact
+    """
+    with _artifact_lock:
+        _artifact_entries[run_id].append(entry)
+
+
+def pop_artifact_entries(run_id):
+    """
+    Remove and return the entries of the data artifact of a flow run
+
+    Args:
+        run_id: id of the flow run
+
+    Returns:
+        list: rows of the artifact
+    """
+    with _artifact_lock:
+        return _artifact_entries.pop(run_id, [])
+
+
 def upd_data_artifact(info, data):
     """
     Update Artifact
 
-    - Retrieve the artifact from the Prefect Variable
-    - Add data to the artifact
-        - Save the artifact back to the Prefect Variable
+    - Add data to the entries of the current flow run (in memory)
+    - The entries are published once, by `save_artifact` at the end of the flow
 
     Args:
         info: information
         data: data to add
     """
-
-    # get varoaible
-    data_artifact = Variable.get("data_artifact", default=[])
-
-    # add data
-    data_artifact.append({"info": info, "data": data})
-
-    # save variable
-    Variable.set("data_artifact", data_artifact, overwrite=True)
+    add_artifact_entry(flow_run.id, {"info": info, "data": data})
 
 
 @task(
@@ -45,16 +91,19 @@ def save_artifact(key_name: str):
     """
     Save artifact in Prefect for the Flow
 
-    - Retrieve the artifact from the Prefect Variable
-    - save the artifact with the data
-    - Reset the Prefect Variable for the next run
+    - Retrieve the entries of the current flow run
+    - save the artifact with the data (a single table artifact)
+    - Drop the entries of the run
 
     Args:
         key: key of artifact (name of the artifact)
     """
 
     # get data
-    data_artifact = Variable.get("data_artifact", default=[])
+    data_artifact = pop_artifact_entries(flow_run.id)
+
+    if not data_artifact:
+        return
 
     # create data
     create_table_artifact(
@@ -62,30 +111,54 @@ def save_artifact(key_name: str):
         table=data_artifact,
     )
 
-    # reset variable
-    Variable.set("data_artifact", [], overwrite=True)
-
 
 @task(
     name="get_data_api",
     description="Get data from API",
     task_run_name="get-data-api-{url}",
 )
-def get_data_api(url: str, **kwargs) -> dict:
+def get_data_api(
+    url: str,
+    paginate: bool = False,
+    max_records: int = None,
+    watermark: Watermark = None,
+    **kwargs,
+) -> list:
     """
     Get data from API
 
+    With `paginate`, the pages of the API are followed (`limit/offset` or `next`)
+    and fetched concurrently, see `core.libs.api_utils.iter_pages`.
+
+    With a `watermark`, only the records updated since the watermark are
+    fetched, see `core.libs.api_utils.iter_updated_pages`.
+
     Args:
         url: URL of the API
+        paginate: follow the pagination of the API
+        max_records: max number of records to fetch when paginating (None for all)
+        watermark: watermark of an incremental extraction (with `paginate`)
         kwargs: additional parameters for the request
 
     Returns:
-        dict: JSON response from the API
+        list: records from the API
     """
     try:
-        response = requests.get(url, **kwargs)
-        response.raise_for_status()  # Raise an error for bad responses
-        return response.json()["results"]
+        if not paginate:
+            return fetch_json(url, **kwargs)["results"]
+
+        if watermark is not None:
+            pages = iter_updated_pages(
+                url, watermark, max_records=max_records, **kwargs
+            )
+        else:
+            pages = iter_pages(url, max_records=max_records, **kwargs)
+
+        data = []
+        for records in pages:
+            data.extend(records)
+
+        return data
 
     except Exception as e:
         raise ValueError(f"Error fetching data from API: {str(e)}")
@@ -100,6 +173,8 @@ def get_data_schema(file_path: str, table_name: str) -> dict:
     """
     Get data schema from YAML file
 
+    The YAML file is parsed once and cached, see `core.libs.schema_registry`.
+
     Args:
         file_path: Path to the YAML file
         table_name: Name of the table to get the schema for
@@ -110,17 +185,114 @@ def get_data_schema(file_path: str, table_name: str) -> dict:
     # Get logger
     logger = get_run_logger()
 
-    # Load the YAML file
-    with open(file_path, "r") as file:
-        config = yaml.safe_load(file)
+    # Find the table in the schema registry
+    data_schema = get_schema(table_name, file_path)
+
+    if not data_schema:
+        logger.error(f"Table {table_name} not found in {file_path}")
+
+    return data_schema
 
-    # Find the table in the YAML file
-    for table in config["datamodel"]["tables"]:
-        if table["name"] == table_name:
-            return table
 
-    logger.error(f"Table {table_name} not found in {file_path}")
-    return {}
+def cast_iso_values(values, iso_type, target_type):
+    """
+    Cast strings to timestamps of `iso_type`, then to the target type.
+
+    The strings are cast at once. When one of them is not a valid date (e.g.
+    month 13), they are cast one by one and the invalid ones become null.
+
+    Args:
+        values: strings to cast (ISO 8601 or null)
+        iso_type: timestamp type the strings are parsed as (with or without
+            timezone)
+        target_type: timestamp type
+
+    Returns:
+        column of timestamps
+    """
+    try:
+        return pc.cast(values, iso_type).cast(target_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+
+    parsed = []
+    for value in values.to_pylist():
+        try:
+            parsed.append(pc.cast(pa.array([value], pa.string()), iso_type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            parsed.append(pa.nulls(1, iso_type))
+
+    return pa.chunked_array(parsed, iso_type).cast(target_type)
+
+
+def cast_iso_datetime(column, target_type):
+    """
+    Cast the ISO 8601 strings of a column to timestamps, the other values
+    become null.
+
+    The strings with a timezone and the naive ones (UTC) are cast apart, each
+    at once.
+
+    Args:
+        column: column to cast
+        target_type: timestamp type
+
+    Returns:
+        column of timestamps
+    """
+    is_iso = pc.fill_null(pc.match_substring_regex(column, ISO_DATETIME_PATTERN), False)
+    has_zone = pc.fill_null(pc.match_substring_regex(column, ISO_ZONE_PATTERN), False)
+    is_zoned = pc.and_(is_iso, has_zone)
+    is_naive = pc.and_(is_iso, pc.invert(has_zone))
+
+    null = pa.scalar(None, column.type)
+    zoned = cast_iso_values(
+        pc.if_else(is_zoned, column, null),
+        pa.timestamp(target_type.unit, tz="UTC"),
+        target_type,
+    )
+    naive = cast_iso_values(
+        pc.if_else(is_naive, column, null),
+        pa.timestamp(target_type.unit),
+        target_type,
+    )
+
+    return pc.coalesce(zoned, naive)
+
+
+def cast_datetime(column, target_type):
+    """
+    Cast a column of strings to timestamps.
+
+    ISO 8601 strings with a timezone are cast at once. When some values are
+    not, the ISO 8601 values are cast apart and the others are parsed with
+    the `DATETIME_FORMATS` (naive values are UTC). The values which can't be
+    parsed become null instead of failing the whole column.
+
+    Args:
+        column: column to cast
+        target_type: timestamp type
+
+    Returns:
+        column of timestamps
+    """
+    try:
+        return pc.cast(column, target_type)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        pass
+
+    parsed = cast_iso_datetime(column, target_type)
+    for fmt in DATETIME_FORMATS:
+        values = pc.strptime(
+            column, format=fmt, unit=target_type.unit, error_is_null=True
+        ).cast(target_type)
+        parsed = pc.coalesce(parsed, values)
+
+    nb_errors = parsed.null_count - column.null_count
+    if nb_errors:
+        get_run_logger().warning(f"{nb_errors} values can't be parsed as datetime")
+
+    return parsed
 
 
 @task(
@@ -132,6 +304,9 @@ def update_columns_types(table: pa.Table, data_schema: dict) -> pa.Table:
     """
     Update columns types based on the schema from config YAML file.
 
+    The columns are cast in Arrow, without going through NumPy, and the
+    columns which already have the right type are kept as is (zero-copy).
+
     Args:
         table: PyArrow Table to update
         data_schema: Schema of the table to update
@@ -139,40 +314,70 @@ def update_columns_types(table: pa.Table, data_schema: dict) -> pa.Table:
     Returns:
         PyArrow Table with updated column types
     """
-    # Convert table to dict of arrays for modification
-    data_dict = {
-        col_name: table[col_name].to_numpy() for col_name in table.column_names
-    }
-
-    # Update types based on schema
-    for col in data_schema["columns"]:
-        col_name = col["name"]
-        col_type = col["type"]
-
-        if col_name in table.column_names:
-            # Create a new PyArrow type based on the schema
-            if col_type == "integer":
-                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.int64())
-            elif col_type == "float":
-                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.float64())
-            elif col_type == "string":
-                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.string())
-            elif col_type == "datetime":
-                # Convert to timestamp, handling potential parsing errors
-                try:
-                    data_dict[col_name] = pa.array(
-                        data_dict[col_name], type=pa.timestamp("ns")
-                    )
-                except:
-                    # For invalid datetime values, keep as string
-                    data_dict[col_name] = pa.array(
-                        data_dict[col_name], type=pa.string()
-                    )
-            elif col_type == "bool":
-                data_dict[col_name] = pa.array(data_dict[col_name], type=pa.bool_())
-
-    # Recreate the table with updated arrays
-    return pa.Table.from_arrays(
-        [data_dict[col_name] for col_name in table.column_names],
-        names=table.column_names,
-    )
+    for field in get_arrow_schema(data_schema):
+        if field.name not in table.column_names:
+            continue
+
+        index = table.schema.get_field_index(field.name)
+        column = table.column(index)
+
+        # Already the right type -> nothing to do
+        if column.type == field.type:
+            continue
+
+        if pa.types.is_timestamp(field.type) and pa.types.is_string(column.type):
+            column = cast_datetime(column, field.type)
+        else:
+            column = pc.cast(column, field.type)
+
+        table = table.set_column(index, field.name, column)
+
+    return table
+
+
+class _DigestSink:
+    """
+    Writable file which feeds a hash instead of storing the bytes
+    """
+
+    def __init__(self, digest):
+        self.digest = digest
+        self.closed = False
+
+    def write(self, data):
+        self.digest.update(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def fingerprint(*parts) -> str:
+    """
+    Fingerprint of the inputs of a step, to skip it when they did not change.
+
+    Tables and record batches are hashed from their Arrow IPC stream (schema
+    and values), the other parts from their JSON (keys sorted).
+
+    Args:
+        parts: tables, record batches or JSON serializable values
+
+    Returns:
+        str: hex digest of the parts
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    for part in parts:
+        # Type of the module checked first: pyarrow is not imported for JSON parts
+        is_arrow = type(part).__module__.startswith("pyarrow")
+        if is_arrow and isinstance(part, (pa.Table, pa.RecordBatch)):
+            sink = pa.PythonFile(_DigestSink(digest), mode="w")
+            with pa.ipc.new_stream(sink, part.schema) as writer:
+                writer.write(part)
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+
+    return digest.hexdigest()
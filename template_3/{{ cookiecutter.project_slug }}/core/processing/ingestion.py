@@ -1,4 +1,4 @@
-import pyarrow as pa
+from __future__ import annotations
 
 # Prefect
 from prefect import task
@@ -6,14 +6,33 @@ from prefect import task
 # Paths
 from core.config.path import URL_API, PATH_CONFIG_SCHEMA
 
+# Settings
+from core.config.settings import (
+    API_MAX_RECORDS,
+    API_WATERMARK_FIELD,
+    DB_COPY_BATCH_ROWS,
+)
+
 # Utils
 from core.libs.utils import (
     get_data_api,
     upd_data_artifact,
-    get_data_schema,
     update_columns_types,
+    fingerprint,
 )
-from core.libs.db_utils import save_to_postgres
+from core.libs.state_utils import read_state, write_state
+from core.libs.api_utils import iter_updated_pages, Watermark
+from core.libs.schema_registry import get_schema, get_column_paths
+from core.libs.db_utils import upsert_batches_to_postgres
+
+# Lazy imports: pyarrow is imported at its first use
+from core.libs.lazy_utils import lazy_import
+
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+
+# Empty dict used to resolve missing nested values
+_EMPTY = {}
 
 
 def get_nested_value(item, path, default=None):
@@ -44,6 +63,46 @@ def get_nested_value(item, path, default=None):
         return default
 
 
+def _get_level(values, key):
+    """
+    Get the value of a key for each dict of a list, None if missing or not a dict
+    """
+    try:
+        return [(value or _EMPTY).get(key) for value in values]
+    except AttributeError:
+        # Some values are not dicts -> check each value
+        return [value.get(key) if isinstance(value, dict) else None for value in values]
+
+
+def extract_columns(json_data, column_paths):
+    """
+    Extract the columns from the records, one list per output column.
+
+    Each level of a path is resolved for all the records at once, and the
+    levels shared by several columns (e.g. `pad` for `pad.name` and
+    `pad.country.name`) are resolved only once.
+
+    Args:
+        json_data (list): records to extract the columns from
+        column_paths (tuple): compiled paths, see `get_column_paths`
+
+    Returns:
+        dict: values of each column
+    """
+    levels = {(): json_data}
+    columns = {}
+
+    for name, keys in column_paths:
+        for depth in range(1, len(keys) + 1):
+            prefix = keys[:depth]
+            if prefix not in levels:
+                levels[prefix] = _get_level(levels[prefix[:-1]], prefix[-1])
+
+        columns[name] = levels[keys]
+
+    return columns
+
+
 @task(
     name="filter_columns",
     task_run_name="filter-columns",
@@ -58,22 +117,119 @@ def filter_columns(json_data, data_schema):
         columns (list): List of columns to keep
     """
 
-    # Create a dictionary to map link
-    corresp_dict = {col["name"]: col["link"] for col in data_schema["columns"]}
+    # Compiled links of the columns
+    column_paths = get_column_paths(data_schema)
+
+    # Extract the necessary fields, one list per column
+    columns = extract_columns(json_data, column_paths)
+
+    # Convert the columns to a PyArrow Table
+    return pa.Table.from_pydict(columns)
+
+
+def get_struct_path(table, keys):
+    """
+    Get a nested field of a table of struct columns by following a tuple of keys.
+
+    Args:
+        table (pa.Table): Table with nested (struct) columns
+        keys (tuple): Path to the field
+
+    Returns:
+        The values of the field, null values if the path does not exist
+    """
+    if keys[0] not in table.column_names:
+        return pa.nulls(table.num_rows)
+
+    column = table[keys[0]]
+
+    for key in keys[1:]:
+        if not pa.types.is_struct(column.type) or column.type.get_field_index(key) < 0:
+            return pa.nulls(table.num_rows)
+
+        column = pc.struct_field(column, key)
+
+    return column
+
+
+@task(
+    name="project_columns",
+    task_run_name="project-columns",
+    description="Project columns from nested data",
+)
+def project_columns(table, data_schema):
+    """
+    Get necessary columns from a table of nested records (Arrow engine)
+
+    The links of the schema are resolved with struct field access,
+    the projection runs in Arrow without looping over the rows in Python.
+
+    Args:
+        table (pa.Table): Table with nested (struct) columns
+        data_schema (dict): Schema of the table
+    """
+    column_paths = get_column_paths(data_schema)
+
+    return pa.table({name: get_struct_path(table, keys) for name, keys in column_paths})
 
-    data = []
 
-    # Loop through the JSON data and extract the necessary fields
-    for item in json_data:
-        filtered_item = {}
-        for new_name, old_name in corresp_dict.items():
-            # Extract the value from the nested structure
-            filtered_item[new_name] = get_nested_value(item, old_name)
+def records_to_table(json_data):
+    """
+    Convert records to a table of nested (struct) columns.
 
-        data.append(filtered_item)
+    The type of the nested fields is inferred on all the records,
+    not only on the first one.
+
+    Args:
+        json_data (list): records
+
+    Returns:
+        pa.Table: Table with one column per top-level key
+    """
+    if not json_data:
+        return pa.table({})
 
-    # Convert the list of dictionaries to a PyArrow Table
-    return pa.Table.from_pylist(data)
+    return pa.Table.from_struct_array(pa.array(json_data))
+
+
+def select_columns(json_data, data_schema, engine="python"):
+    """
+    Get necessary columns from the records with the chosen engine
+
+    - python: compiled columnar extractor (`filter_columns`)
+    - arrow: struct field access in Arrow (`project_columns`)
+
+    Args:
+        json_data (list): records
+        data_schema (dict): Schema of the table
+        engine (str): python or arrow
+    """
+    if engine == "arrow":
+        return project_columns.fn(records_to_table(json_data), data_schema)
+
+    return filter_columns.fn(json_data, data_schema)
+
+
+def iter_record_batches(pages, data_schema, engine="python"):
+    """
+    Project and cast each page of records into a PyArrow RecordBatch
+
+    Args:
+        pages: iterable of pages (list of records)
+        data_schema: Schema of the table
+        engine: engine of the projection (python or arrow)
+
+    Yields:
+        pa.RecordBatch: typed batch of each page
+    """
+    for records in pages:
+        if not records:
+            continue
+
+        table = select_columns(records, data_schema, engine)
+        table = update_columns_types.fn(table, data_schema)
+
+        yield from table.to_batches()
 
 
 @task(
@@ -81,44 +237,122 @@ def filter_columns(json_data, data_schema):
     task_run_name="task-ingestion",
     description="Ingest data from API and store in PostgreSQL",
 )
-def task_ingestion():
+def task_ingestion(
+    url: str = URL_API,
+    max_records: int = API_MAX_RECORDS,
+    stream: bool = False,
+    engine: str = "python",
+):
     """
     Task to ingest data from API
 
-    - Get data from API
+    - Get data from API: the launches updated since the last run (watermark
+      on `last_updated`), up to `max_records`
     - Retrieve necessary columns
     - Update columns types
-    - Save data to PostgreSQL database
+    - Upsert data into the PostgreSQL database (key and partition of the
+      `storage` of the schema: launch_id, launch_date)
+
+    The fingerprint of the records (and of the schema) is saved after each
+    upsert: when the API returns the same records on the next run, nothing
+    is projected or loaded. The stream mode always loads.
+
+    Args:
+        url: URL of the API (first page)
+        max_records: max number of records to fetch (None for all)
+        stream: process the data page by page, the memory is bounded by one page
+        engine: engine of the projection, python (row records) or arrow (structs)
+
+    Returns:
+        dict: table loaded, number of rows loaded, changed (False when no row
+            was new or updated)
     """
 
-    file_src = f"{URL_API}"
+    file_src = f"{url}"
     schema_name = "public"
     table_name = "raw_rockets"
 
-    # Get schema of data
-    data_schema = get_data_schema(
-        file_path=PATH_CONFIG_SCHEMA, table_name="raw_rockets"
+    # Get schema of data, and its layout in the database (key, partition)
+    data_schema = get_schema("raw_rockets", PATH_CONFIG_SCHEMA)
+    storage = data_schema["storage"]
+    upsert_options = {
+        "key": storage["key"],
+        "loaded_at": storage.get("loaded_at"),
+        "partition_key": storage.get("partition", {}).get("column"),
+    }
+
+    # Incremental extraction -> launches updated since the last run
+    watermark_state = f"watermark_{table_name}"
+    watermark = Watermark(
+        API_WATERMARK_FIELD, read_state(watermark_state), max_records=max_records
+    )
+
+    # Streaming mode -> each page goes straight from the API to the database
+    if stream:
+        pages = iter_updated_pages(file_src, watermark, max_records=max_records)
+        nb_rows = upsert_batches_to_postgres(
+            iter_record_batches(pages, data_schema, engine),
+            table_name=table_name,
+            schema=schema_name,
+            **upsert_options,
+        )
+        write_state(watermark_state, watermark.next_state())
+
+        upd_data_artifact(
+            info=f"Ingestion data from {file_src} to PostgreSQL (stream)",
+            data=f"{nb_rows['staged']} rows loaded, {nb_rows['upserted']} new or updated in {schema_name}.{table_name}",
+        )
+        return {
+            "table": table_name,
+            "rows": nb_rows["staged"],
+            "changed": nb_rows["upserted"] > 0,
+        }
+
+    # Load data -> returns the records of all the pages
+    json_data = get_data_api(
+        file_src, paginate=True, max_records=max_records, watermark=watermark
     )
 
-    # Load data -> returns a JSON file
-    json_data = get_data_api(file_src)
+    # No new records, or same records and schema as the last ingestion -> skip
+    data_fingerprint = fingerprint(json_data, data_schema)
+    state_name = f"fingerprint_{table_name}"
+    if not json_data or read_state(state_name) == data_fingerprint:
+        upd_data_artifact(
+            info=f"Ingestion data from {file_src} to PostgreSQL",
+            data="No new data since the last run, skipped",
+        )
+        return {"table": table_name, "rows": 0, "changed": False}
 
     # Collect necessary columns
-    table = filter_columns(json_data, data_schema)
+    if engine == "arrow":
+        table = project_columns(records_to_table(json_data), data_schema)
+    else:
+        table = filter_columns(json_data, data_schema)
 
     # Update columns types
     table = update_columns_types(table, data_schema)
 
-    # Convert PyArrow table to pandas DataFrame for database storage
-    df = table.to_pandas()
-
-    # Save data to PostgreSQL
-    save_to_postgres(
-        df=df, table_name=table_name, schema=schema_name, if_exists="append"
+    # Upsert data into PostgreSQL
+    nb_rows = upsert_batches_to_postgres(
+        table.to_batches(max_chunksize=DB_COPY_BATCH_ROWS),
+        table_name=table_name,
+        schema=schema_name,
+        **upsert_options,
     )
 
+    # Loaded -> the next run with the same records is skipped, the next
+    # extraction starts from the newest update
+    write_state(state_name, data_fingerprint)
+    write_state(watermark_state, watermark.next_state())
+
     # Update artifact
     upd_data_artifact(
         info=f"Ingestion data from {file_src} to PostgreSQL",
-        data=f"{len(df)} rows and {len(df.columns)} columns saved to {schema_name}.{table_name}",
+        data=f"{nb_rows['staged']} rows and {table.num_columns} columns loaded, {nb_rows['upserted']} new or updated in {schema_name}.{table_name}",
     )
+
+    return {
+        "table": table_name,
+        "rows": nb_rows["staged"],
+        "changed": nb_rows["upserted"] > 0,
+    }
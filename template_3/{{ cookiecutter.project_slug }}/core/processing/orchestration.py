@@ -2,15 +2,31 @@
 from prefect import flow
 from prefect.logging import get_run_logger
 
+# Paths
+from core.config.path import URL_API
 
 # Utils
 from core.libs.utils import (
     save_artifact,
 )
+from core.libs.api_utils import reset_http_session
+from core.libs.db_utils import dispose_engines
 
 # Tasks
 from core.processing.ingestion import task_ingestion
-from core.processing.transform import task_transform
+from core.processing.transform import task_transform, reset_dbt_runner
+
+
+def reset_clients():
+    """
+    Close the clients shared by the runs of the process: HTTP session,
+    database connection pools and dbt runner (long-lived mode, see serve.py)
+
+    The next run opens new ones.
+    """
+    reset_http_session()
+    dispose_engines()
+    reset_dbt_runner()
 
 
 @flow(
@@ -19,9 +35,17 @@ from core.processing.transform import task_transform
     log_prints=True,
     description="Flow to orchestrate the ingestion, transformation, and loading of data",
 )
-def flow_rockets_launch():
+def flow_rockets_launch(url: str = URL_API, keep_warm: bool = False):
     """
     Flow to orchestrate the ingestion, transformation, and loading of data
+
+    The dbt transformation only runs the models downstream of the tables
+    with new or updated rows, it is skipped when no row was loaded.
+
+    Args:
+        url: URL of the API (first page)
+        keep_warm: keep the database connections open for the next run
+            (long-lived mode, see serve.py)
     """
 
     # Get logger
@@ -31,14 +55,20 @@ def flow_rockets_launch():
     logger.info("FLOW ROCKETS LAUNCH STARTED")
     logger.info("-" * 50)
 
-    # Run the ingestion flow
-    task_ingestion()
+    try:
+        # Run the ingestion flow
+        result = task_ingestion(url=url)
 
-    # Run the transformation with dbt
-    task_transform()
+        # Run the transformation with dbt: only the models downstream of the
+        # tables with new rows (none -> skipped)
+        task_transform(tables=[result["table"]] if result["changed"] else [])
+    finally:
+        # Save the artifact (also the entries of a failed run)
+        save_artifact(key_name="flow-rockets-launch-artifact")
 
-    # Save the artifact
-    save_artifact(key_name="flow-rockets-launch-artifact")
+        # Close the database connections (the process ends with the run)
+        if not keep_warm:
+            dispose_engines()
 
     logger.info("-" * 50)
     logger.info("FLOW ROCKETS LAUNCH COMPLETED")
@@ -1,15 +1,83 @@
-import os
+import threading
 from dotenv import load_dotenv
 
 # Prefect
 from prefect import task
 from prefect.logging import get_run_logger
-from prefect_dbt.cli.commands import DbtCoreOperation
+
+# Paths
+from core.config.path import PATH_DBT_PROJECT
+
+# Settings
+from core.config.settings import DBT_SOURCE_NAME
 
 # Utils
 from core.libs.utils import upd_data_artifact
 
-load_dotenv()
+# Lazy imports: dbt is imported at the first command (not when no table was loaded)
+from core.libs.lazy_utils import lazy_import
+
+dbt_main = lazy_import("dbt.cli.main")
+
+# dbt runner shared by the runs of the process (manifest parsed once)
+_dbt_runner = None
+_dbt_lock = threading.Lock()
+
+
+def invoke_dbt(args: list):
+    """
+    Invoke a dbt command in the process, with the dbt project of the template
+
+    The project is parsed once per process: the manifest is kept by the
+    runner and reused by the next commands (the first parse itself is
+    partial, from `target/partial_parse.msgpack`). dbt is not thread safe,
+    the commands run one at a time. dbt and the variables of the profile
+    (`.env` file) are loaded at the first command.
+
+    Args:
+        args: command and arguments, e.g. ["run", "--select", "stg_rockets"]
+
+    Returns:
+        dbtRunnerResult: result of the command
+    """
+    global _dbt_runner
+
+    project_args = [
+        "--project-dir",
+        PATH_DBT_PROJECT,
+        "--profiles-dir",
+        PATH_DBT_PROJECT,
+    ]
+
+    with _dbt_lock:
+        if _dbt_runner is None:
+            load_dotenv()
+
+            parse = dbt_main.dbtRunner().invoke(["parse", *project_args])
+            if not parse.success:
+                raise RuntimeError(f"dbt parse failed: {parse.exception}")
+
+            _dbt_runner = dbt_main.dbtRunner(manifest=parse.result)
+
+        result = _dbt_runner.invoke([*args, *project_args])
+
+    if not result.success:
+        raise RuntimeError(f"dbt {args[0]} failed: {result.exception or result.result}")
+
+    return result
+
+
+def reset_dbt_runner():
+    """
+    Drop the dbt runner of the process (e.g. after a failed run of the
+    long-lived mode, or to take changed models into account)
+
+    The next command parses the project again.
+    """
+    global _dbt_runner
+
+    with _dbt_lock:
+        _dbt_runner = None
 
 
 @task(
@@ -17,29 +85,49 @@ load_dotenv()
     task_run_name="task-transform",
     description="Transform data using DBT",
 )
-def task_transform():
+def task_transform(tables: list = None):
     """
     Task to transform data using DBT
 
-    This task runs DBT models to transform data in PostgreSQL
+    This task runs DBT models to transform data in PostgreSQL. Only the
+    models downstream of the loaded tables (dbt sources) are run, e.g.
+    `source:raw.raw_rockets+`, and dbt is not run at all when no table
+    was loaded.
+
+    Args:
+        tables: raw tables with new or updated rows (None to run all the models)
+
+    Returns:
+        int: number of models run
     """
     logger = get_run_logger()
 
-    # Load environment variables from .env file
-    os.environ["DB_USER"] = os.getenv("DB_USER")
-    os.environ["DBT_ENV_SECRET_DB_PASSWORD"] = os.getenv("DBT_ENV_SECRET_DB_PASSWORD")
-    os.environ["DB_NAME"] = os.getenv("DB_NAME")
+    # No new rows -> nothing to transform
+    if tables is not None and not tables:
+        logger.info("No table loaded, transformation skipped")
+        upd_data_artifact(
+            info=f"Country launch statistics", data="No new data, skipped"
+        )
+        return 0
+
+    # Models downstream of the loaded tables
+    select = []
+    if tables:
+        select = [
+            "--select",
+            *[f"source:{DBT_SOURCE_NAME}.{table}+" for table in tables],
+        ]
 
     # Run DBT models to transform data
     try:
-        DbtCoreOperation(
-            commands=["dbt run"],
-            project_dir="dbt_project",
-            profiles_dir="dbt_project",
-        ).run()
+        result = invoke_dbt(["run", *select])
+        nb_models = len(result.result.results)
 
         upd_data_artifact(
-            info=f"Country launch statistics", data="Transformation completed"
+            info=f"Country launch statistics",
+            data=f"Transformation completed, {nb_models} models run",
         )
+        return nb_models
     except Exception as e:
         logger.error(f"Error running DBT: {e}")
+        raise
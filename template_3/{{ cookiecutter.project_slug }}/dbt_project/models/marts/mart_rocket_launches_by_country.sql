@@ -1,17 +1,37 @@
-{{config(materialized='table')}}
+{{ config(
+    materialized='incremental',
+    unique_key='country',
+    incremental_strategy='delete+insert',
+    on_schema_change='append_new_columns',
+    post_hook="DELETE FROM {{ this }} WHERE nb_launches = 0"
+) }}
 
-WITH rocket_launches AS (
-	SELECT
-		country,
-		COUNT(*) AS nb_launches,
-		SUM(CASE WHEN status = 'Success' THEN 1 ELSE 0 END) AS nb_success
-	FROM {{ ref('stg_rockets') }}
-	GROUP BY country
-	ORDER BY nb_launches DESC
+{% if is_incremental() %}
+-- Launches inserted or updated since the last run
+WITH updated_launches AS (
+    SELECT country, previous_country FROM {{ ref('stg_rockets') }}
+    WHERE loaded_at > (SELECT COALESCE(MAX(last_run.loaded_at), '-infinity') FROM {{ this }} AS last_run)
+),
+
+-- Countries of these launches, and the countries they moved from: only these
+-- countries are aggregated again (replaced), the others are left as they are
+countries AS (
+    SELECT country FROM updated_launches WHERE country IS NOT NULL
+    UNION
+    SELECT previous_country FROM updated_launches WHERE previous_country IS NOT NULL
+)
+{% else %}
+WITH countries AS (
+    SELECT DISTINCT country FROM {{ ref('stg_rockets') }} WHERE country IS NOT NULL
 )
+{% endif %}
 
+-- A country left without launches counts 0 launches, its row is deleted (post hook)
 SELECT
-	country,
-	nb_launches,
-	nb_success
-FROM rocket_launches
\ No newline at end of file
+    countries.country,
+    COUNT(launches.launch_id) AS nb_launches,
+    COALESCE(SUM(CASE WHEN launches.status = 'Success' THEN 1 ELSE 0 END), 0) AS nb_success,
+    MAX(launches.loaded_at) AS loaded_at
+FROM countries
+LEFT JOIN {{ ref('stg_rockets') }} AS launches ON launches.country = countries.country
+GROUP BY countries.country
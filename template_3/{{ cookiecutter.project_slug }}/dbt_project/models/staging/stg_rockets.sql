@@ -1,3 +1,30 @@
-{{ config(materialized='view') }}
+{{ config(
+    materialized='incremental',
+    unique_key='launch_id',
+    on_schema_change='append_new_columns',
+    indexes=[
+        {'columns': ['launch_id'], 'unique': True},
+        {'columns': ['loaded_at']},
+        {'columns': ['country']},
+    ]
+) }}
 
-SELECT * FROM public.raw_rockets
\ No newline at end of file
+-- Rows loaded before the launch id have no key, they are left out
+SELECT
+    raw.*,
+{% if is_incremental() %}
+    -- Country of the launch before this run, the mart aggregates again the
+    -- country a launch moved from
+    previous.country AS previous_country
+{% else %}
+    CAST(NULL AS TEXT) AS previous_country
+{% endif %}
+FROM {{ source('raw', 'raw_rockets') }} AS raw
+{% if is_incremental() %}
+LEFT JOIN {{ this }} AS previous ON previous.launch_id = raw.launch_id
+{% endif %}
+WHERE raw.launch_id IS NOT NULL
+{% if is_incremental() %}
+    -- Only the rows inserted or updated since the last run
+    AND raw.loaded_at > (SELECT COALESCE(MAX(last_run.loaded_at), '-infinity') FROM {{ this }} AS last_run)
+{% endif %}
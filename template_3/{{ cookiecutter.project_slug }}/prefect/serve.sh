@@ -0,0 +1,3 @@
+# Long-lived mode (alternative to deploy.sh): no work pool, no worker, the
+# flow runs every minute in this process and keeps its caches between the runs
+python serve.py
@@ -0,0 +1,16 @@
+import sys
+import signal
+
+# Long-lived mode
+from core.libs.serve_utils import serve_flow
+
+# Flows
+from core.processing.orchestration import flow_rockets_launch, reset_clients
+
+if __name__ == "__main__":
+
+    # Stop on SIGTERM as on Ctrl+C (the clients are closed)
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+    # Run the flow every FLOW_SERVE_INTERVAL seconds, in this process
+    serve_flow(flow_rockets_launch, parameters={"keep_warm": True}, reset=reset_clients)
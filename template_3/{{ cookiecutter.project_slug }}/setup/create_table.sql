@@ -1,16 +1,60 @@
--- Connect to the specific database
-\c {{ cookiecutter.database_name }};
+-- Generated from core/config/schemas.yaml by `python -m core.libs.ddl_utils`, do not edit
 
--- Create the rockets table with launch data
+-- raw_rockets: Table containing the raw data
 CREATE TABLE IF NOT EXISTS public.raw_rockets (
-	id SERIAL PRIMARY KEY,
-	launch_date TIMESTAMP NOT NULL,
-	name VARCHAR(255) NOT NULL,
-	status VARCHAR(255),
-	launch_service_provider VARCHAR(255),
-	launch_site VARCHAR(255),
-	country VARCHAR(255),
-	rocket VARCHAR(255),
-	mission VARCHAR(255),
-	mission_type VARCHAR(255)
-);
\ No newline at end of file
+	id SERIAL,
+	launch_id TEXT NOT NULL,
+	launch_date TIMESTAMPTZ NOT NULL,
+	name TEXT NOT NULL,
+	status TEXT,
+	launch_service_provider TEXT,
+	launch_site TEXT,
+	country TEXT,
+	rocket TEXT,
+	mission TEXT,
+	mission_type TEXT,
+	last_updated TIMESTAMPTZ,
+	loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+	PRIMARY KEY (id, launch_date)
+) PARTITION BY RANGE (launch_date);
+
+-- Partitions of launch_date, by 10 years
+DO $$
+BEGIN
+	IF NOT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'public.raw_rockets'::regclass) THEN
+		RAISE NOTICE 'public.raw_rockets is not partitioned, recreate it to partition it';
+		RETURN;
+	END IF;
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_1950 PARTITION OF public.raw_rockets FOR VALUES FROM ('1950-01-01 00:00:00+00') TO ('1960-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_1960 PARTITION OF public.raw_rockets FOR VALUES FROM ('1960-01-01 00:00:00+00') TO ('1970-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_1970 PARTITION OF public.raw_rockets FOR VALUES FROM ('1970-01-01 00:00:00+00') TO ('1980-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_1980 PARTITION OF public.raw_rockets FOR VALUES FROM ('1980-01-01 00:00:00+00') TO ('1990-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_1990 PARTITION OF public.raw_rockets FOR VALUES FROM ('1990-01-01 00:00:00+00') TO ('2000-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_2000 PARTITION OF public.raw_rockets FOR VALUES FROM ('2000-01-01 00:00:00+00') TO ('2010-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_2010 PARTITION OF public.raw_rockets FOR VALUES FROM ('2010-01-01 00:00:00+00') TO ('2020-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_2020 PARTITION OF public.raw_rockets FOR VALUES FROM ('2020-01-01 00:00:00+00') TO ('2030-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_2030 PARTITION OF public.raw_rockets FOR VALUES FROM ('2030-01-01 00:00:00+00') TO ('2040-01-01 00:00:00+00');
+	CREATE TABLE IF NOT EXISTS public.raw_rockets_default PARTITION OF public.raw_rockets DEFAULT;
+END
+$$;
+
+-- Tables created by a previous version: missing columns
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS launch_id TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS launch_date TIMESTAMPTZ;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS name TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS status TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS launch_service_provider TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS launch_site TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS country TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS rocket TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS mission TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS mission_type TEXT;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS last_updated TIMESTAMPTZ;
+ALTER TABLE public.raw_rockets ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMPTZ NOT NULL DEFAULT now();
+
+-- Key of the upserts
+CREATE UNIQUE INDEX IF NOT EXISTS raw_rockets_launch_id_launch_date_key ON public.raw_rockets (launch_id, launch_date);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS raw_rockets_loaded_at_brin ON public.raw_rockets USING brin (loaded_at);
+CREATE INDEX IF NOT EXISTS raw_rockets_country_launch_date_btree ON public.raw_rockets USING btree (country, launch_date);
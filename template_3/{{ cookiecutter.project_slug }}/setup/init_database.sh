@@ -24,8 +24,28 @@ else
     echo "Database initialized."
 fi
 
+echo "Generating tables DDL from core/config/schemas.yaml..."
+DDL_FILE=$(mktemp ./setup/create_table.sql.XXXXXX)
+if ! pixi run python -m core.libs.ddl_utils > "$DDL_FILE" || [ ! -s "$DDL_FILE" ]; then
+    rm -f "$DDL_FILE"
+    echo -e "${RED}Error: DDL generation failed, tables not created.${NC}"
+    exit 1
+fi
+
+# setup/create_table.sql is replaced only when the schemas changed
+if cmp -s "$DDL_FILE" ./setup/create_table.sql; then
+    rm -f "$DDL_FILE"
+else
+    chmod 644 "$DDL_FILE"
+    mv "$DDL_FILE" ./setup/create_table.sql
+    echo "setup/create_table.sql updated from the schemas."
+fi
+
 echo "Creating/Updating tables..."
-sudo -u postgres psql -f ./setup/create_table.sql
+if ! sudo -u postgres psql -v ON_ERROR_STOP=1 -d {{ cookiecutter.database_name }} -f ./setup/create_table.sql; then
+    echo -e "${RED}Error: tables setup failed.${NC}"
+    exit 1
+fi
 echo "Tables setup completed."
 
 echo -e "${GREEN}Database setup completed successfully!${NC}"
\ No newline at end of file